@@ -0,0 +1,296 @@
+"""JSON API for county weather, risk and satellite indicators
+
+A small asyncio HTTP/1.1 server, separate from the Streamlit UI:
+
+    python api_server.py --port 8080
+
+Routes (all GET):
+    /health
+    /counties
+    /counties/<county>/weather
+    /counties/<county>/anomaly
+    /counties/<county>/satellite[?indicator=NDVI Analysis]
+    /regional
+
+Responses are cached as encoded bytes with a strong ETag, so repeated and
+conditional requests (If-None-Match -> 304) never touch the services.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from datetime import datetime
+from urllib.parse import parse_qs, unquote, urlsplit
+import numpy as np
+import pandas as pd
+from config import API_HOST, API_PORT, API_RESPONSE_TTL, API_RESPONSE_CACHE_SIZE, API_MAX_HEADER_BYTES
+from county_registry import COUNTY_REGISTRY
+from satellite_service import SatelliteService
+from weather_service import WeatherService
+from batch_report import INDICATOR_COLUMNS, load_latest_report
+
+_REASONS = {200: 'OK', 304: 'Not Modified', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            500: 'Internal Server Error'}
+
+
+class ApiError(Exception):
+    """An error returned to the client as ``{"error": message}``"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def to_json_compatible(value):
+    """Convert service results (NumPy scalars, DataFrames, timestamps) to plain JSON types"""
+    if isinstance(value, dict):
+        return {key: to_json_compatible(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_json_compatible(item) for item in value]
+    if isinstance(value, pd.DataFrame):
+        return to_json_compatible(value.to_dict('records'))
+    if isinstance(value, (pd.Timestamp, datetime)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    return value
+
+
+class ResponseCache:
+    """Encoded responses with their ETags, keyed by request target, expiring after ``ttl`` seconds
+
+    Concurrent misses for the same key share one computation.
+    """
+
+    def __init__(self, ttl=API_RESPONSE_TTL, max_entries=API_RESPONSE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, etag, body)
+        self._pending = {}
+        self._stats = {'hits': 0, 'misses': 0, 'coalesced': 0}
+
+    async def get_or_compute(self, key, compute):
+        """(etag, body) for ``key``, awaiting ``compute()`` for the payload on a miss"""
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[1], entry[2]
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(pending)
+
+        self._stats['misses'] += 1
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            body = json.dumps(to_json_compatible(await compute()), separators=(',', ':')).encode()
+            etag = '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+            self._entries[key] = (time.monotonic() + self.ttl, etag, body)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            future.set_result((etag, body))
+            return etag, body
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self._pending[key]
+
+    def stats(self):
+        return dict(self._stats, entries=len(self._entries))
+
+
+class ApiServer:
+    """Routes API requests to the weather and satellite services"""
+
+    def __init__(self, weather_service=None, satellite_service=None, cache=None):
+        self.weather_service = weather_service or WeatherService()
+        self.satellite_service = satellite_service or SatelliteService()
+        self.cache = cache or ResponseCache()
+        self._counties = {county.lower(): county for county in COUNTY_REGISTRY.county_names}
+        self._stats = {'requests': 0, 'not_modified': 0, 'errors': 0}
+
+    async def handle_connection(self, reader, writer):
+        """Serve keep-alive HTTP/1.1 requests on one connection"""
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b'\r\n\r\n')
+                except asyncio.LimitOverrunError:
+                    await self._write(writer, 400, *self._error_body('Request header too large'), keep_alive=False)
+                    break
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+
+                request_line, *header_lines = head.decode('latin-1').split('\r\n')
+                headers = {}
+                for line in header_lines:
+                    name, _, value = line.partition(':')
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                parts = request_line.split()
+                if len(parts) != 3:
+                    await self._write(writer, 400, *self._error_body('Malformed request line'), keep_alive=False)
+                    break
+                method, target, version = parts
+
+                keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+                try:
+                    content_length = int(headers.get('content-length') or 0)
+                except ValueError:
+                    content_length = -1
+                if content_length < 0:
+                    await self._write(writer, 400, *self._error_body('Invalid Content-Length'), keep_alive=False)
+                    break
+                if content_length:
+                    await reader.readexactly(content_length)  # Bodies are ignored
+
+                status, etag, body = await self.respond(method, target)
+                if status == 200 and etag in self._if_none_match(headers):
+                    self._stats['not_modified'] += 1
+                    status, body = 304, b''
+                await self._write(writer, status, etag, body, keep_alive, head_only=method == 'HEAD')
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+
+    async def respond(self, method, target):
+        """(status, etag, body) for a request"""
+        self._stats['requests'] += 1
+        if method not in ('GET', 'HEAD'):
+            return (405, *self._error_body('Only GET is supported'))
+        if urlsplit(target).path.rstrip('/') == '/health':
+            return 200, None, json.dumps(self.health()).encode()
+        try:
+            etag, body = await self.cache.get_or_compute(target, lambda: self.route(target))
+            return 200, etag, body
+        except ApiError as e:
+            return (e.status, *self._error_body(str(e)))
+        except Exception as e:
+            print(f"API error ({target}): {e}")
+            self._stats['errors'] += 1
+            return (500, *self._error_body('Internal error'))
+
+    async def route(self, target):
+        """The JSON payload for a request target"""
+        url = urlsplit(target)
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        parts = [unquote(part) for part in url.path.strip('/').split('/') if part]
+
+        if parts == ['counties']:
+            return [
+                {'state': state, 'county': county, 'lat': coords['lat'], 'lon': coords['lon']}
+                for state, county, coords in COUNTY_REGISTRY.locations()
+            ]
+        if parts == ['regional']:
+            return await self._run(self._regional)
+        if len(parts) == 3 and parts[0] == 'counties':
+            county = self._counties.get(parts[1].lower())
+            if county is None:
+                raise ApiError(404, f"Unknown county: {parts[1]}")
+            handler = {
+                'weather': self._weather,
+                'anomaly': self._anomaly,
+                'satellite': self._satellite
+            }.get(parts[2])
+            if handler is not None:
+                return await self._run(handler, county, query)
+        raise ApiError(404, f"No route for {url.path}")
+
+    def health(self):
+        return {'status': 'ok', 'cache': self.cache.stats(), 'requests': dict(self._stats)}
+
+    async def _run(self, fn, *args):
+        # Services block on I/O and NumPy, so they run on the default thread pool
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    def _location(self, county):
+        county_id = COUNTY_REGISTRY.county_id(county)
+        return COUNTY_REGISTRY.state_of(county_id), COUNTY_REGISTRY.coords(county_id)
+
+    def _weather(self, county, query):
+        state, coords = self._location(county)
+        weather = self.weather_service.get_weather_data(coords['lat'], coords['lon'], county)
+        return dict(weather, county=county, state=state)
+
+    def _anomaly(self, county, query):
+        state, coords = self._location(county)
+        weather = self.weather_service.get_weather_data(coords['lat'], coords['lon'], county)
+        return dict(self.weather_service.detect_anomaly(county, weather), county=county, state=state)
+
+    def _satellite(self, county, query):
+        state, coords = self._location(county)
+        indicators = [query['indicator']] if 'indicator' in query else list(INDICATOR_COLUMNS)
+        unknown = [indicator for indicator in indicators if indicator not in INDICATOR_COLUMNS]
+        if unknown:
+            raise ApiError(400, f"Unknown indicator: {unknown[0]}")
+        return {
+            'county': county,
+            'state': state,
+            'indicators': {
+                indicator: self.satellite_service.county_summary(indicator, county, coords)
+                for indicator in indicators
+            }
+        }
+
+    def _regional(self):
+        # The batch report when recent, otherwise a live nationwide fetch
+        report = load_latest_report()
+        if report is not None:
+            manifest, df = report
+            return {'source': 'batch_report', 'run_id': manifest['run_id'], 'counties': df}
+        df = self.weather_service.get_regional_data(COUNTY_REGISTRY)
+        return {'source': 'live', 'created_at': datetime.now(), 'counties': df}
+
+    def _if_none_match(self, headers):
+        value = headers.get('if-none-match', '')
+        return {tag.strip().removeprefix('W/') for tag in value.split(',') if tag.strip()}
+
+    def _error_body(self, message):
+        return None, json.dumps({'error': message}).encode()
+
+    async def _write(self, writer, status, etag, body, keep_alive=True, head_only=False):
+        headers = [
+            f"HTTP/1.1 {status} {_REASONS.get(status, '')}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Cache-Control: max-age={self.cache.ttl}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if etag:
+            headers.append(f"ETag: {etag}")
+        writer.write(('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + (b'' if head_only else body))
+        await writer.drain()
+
+
+async def serve(host=API_HOST, port=API_PORT, api=None):
+    """Run the API server until cancelled"""
+    api = api or ApiServer()
+    server = await asyncio.start_server(api.handle_connection, host, port, limit=API_MAX_HEADER_BYTES)
+    print(f"SuddAI API listening on {', '.join(str(s.getsockname()) for s in server.sockets)}")
+    async with server:
+        await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve county weather, risk and indicators as JSON")
+    parser.add_argument('--host', default=API_HOST, help="bind address (default: %(default)s)")
+    parser.add_argument('--port', type=int, default=API_PORT, help="port (default: %(default)s)")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
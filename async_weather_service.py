@@ -0,0 +1,293 @@
+import asyncio
+import queue
+import threading
+import time
+import aiohttp
+import pandas as pd
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES
+from config import WEATHER_CACHE_TTLS, RATE_LIMIT_MAX_WAIT, LAST_GOOD_TTL
+from config import ASYNC_HTTP_MAX_CONNECTIONS, ASYNC_REGIONAL_CONCURRENCY, REGIONAL_SAMPLING_MODE
+from http_client import RETRY_STATUS_CODES, retry_backoff
+from county_registry import county_locations
+from cache import make_cache_key
+from resilience import AsyncSingleFlight, CircuitBreaker, CircuitOpenError, RateLimitTimeout
+from weather_service import WeatherCore
+
+
+class AsyncHttpClient:
+    """aiohttp transport with the same timeouts and jittered retries as HttpClient
+
+    One session and connection pool per event loop; the session is created
+    on first use inside the loop.
+    """
+
+    def __init__(self, max_connections=ASYNC_HTTP_MAX_CONNECTIONS, connect_timeout=HTTP_CONNECT_TIMEOUT,
+                 read_timeout=HTTP_READ_TIMEOUT, max_retries=HTTP_MAX_RETRIES):
+        self.max_connections = max_connections
+        self.timeout = aiohttp.ClientTimeout(connect=connect_timeout, sock_read=read_timeout)
+        self.max_retries = max_retries
+        self._session = None
+        self._stats = {'requests': 0, 'retries': 0, 'in_flight': 0}
+
+    def _get_session(self):
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, ttl_dns_cache=300)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+
+    async def get_json(self, url, params=None, before_retry=None):
+        """(status, JSON payload or None), retrying connection errors and 429/5xx with retry_backoff()
+
+        ``before_retry`` is awaited before each retry, e.g. to take another
+        rate limit token; an exception it raises ends the retries.
+        """
+        session = self._get_session()
+        self._stats['requests'] += 1
+        for attempt in range(self.max_retries + 1):
+            self._stats['in_flight'] += 1
+            try:
+                async with session.get(url, params=params) as response:
+                    if response.status not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                        data = await response.json(content_type=None) if response.status == 200 else None
+                        return response.status, data
+                    retry_after = response.headers.get('Retry-After')
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                if attempt == self.max_retries:
+                    raise
+                retry_after = None
+            finally:
+                self._stats['in_flight'] -= 1
+
+            self._stats['retries'] += 1
+            await asyncio.sleep(retry_backoff(attempt, retry_after))
+            if before_retry is not None:
+                await before_retry()
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+    def stats(self):
+        """Requests, retries and attempts currently in flight"""
+        return dict(self._stats)
+
+
+class AsyncWeatherService:
+    """Weather fetching as coroutines multiplexed on one event loop
+
+    ``get_weather_data``, ``get_county_weather`` and ``get_regional_data`` are
+    coroutines with the same arguments and results as WeatherService's.
+    Parsing, mock data, risk classification and frame building come from a
+    WeatherCore (``self.core``), which also provides the process-wide
+    response cache, rate limit and circuit breakers.
+    """
+
+    def __init__(self, synthetic=None, limiter=None, http=None):
+        self.core = WeatherCore(synthetic, limiter)
+        self.http = http or AsyncHttpClient()
+        self.flight = AsyncSingleFlight()
+        self._background = set()
+
+    async def get_weather_data(self, lat, lon, county_name):
+        """Get weather data for a specific location, fetching both endpoints concurrently"""
+        try:
+            current, forecast = await asyncio.gather(
+                self._fetch_or_last_good("weather", lat, lon),
+                self._fetch_or_last_good("forecast", lat, lon)
+            )
+            weather = self.core.build_weather(current, forecast)
+            return weather if weather is not None else self.core.mock_weather(lat, lon, county_name)
+
+        except Exception as e:
+            print(f"Weather API error: {e}")
+            return self.core.mock_weather(lat, lon, county_name)
+
+    async def get_county_weather(self, county, coords):
+        """Weather for one county that never raises, falling back to mock data"""
+        try:
+            return await self.get_weather_data(coords['lat'], coords['lon'], county)
+        except Exception as e:
+            print(f"Regional fetch error for {county}: {e}")
+            return self.core.mock_weather(coords['lat'], coords['lon'], county)
+
+    async def get_regional_data(self, counties_data, max_workers=ASYNC_REGIONAL_CONCURRENCY,
+                                sampling=REGIONAL_SAMPLING_MODE):
+        """Get weather data for all counties, at most ``max_workers`` in flight at once"""
+        locations = county_locations(counties_data)
+        if not locations:
+            return pd.DataFrame()
+
+        plan = self.core.sampling_plan(locations, sampling)
+        targets = locations if plan is None else self.core.sample_locations(locations, plan)
+        weathers = [None] * len(targets)
+        async for index, _, weather in self.iter_regional_data(targets, max_workers):
+            weathers[index] = weather
+        if plan is None:
+            return self.core.build_regional_frame(locations, weathers)
+        return self.core.build_interpolated_frame(locations, plan, weathers)
+
+    async def iter_regional_data(self, counties_data, max_workers=ASYNC_REGIONAL_CONCURRENCY):
+        """Yield (index, (state, county, coords), weather) as each county completes"""
+        locations = county_locations(counties_data)
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def fetch(index, location):
+            async with semaphore:
+                return index, location, await self.get_county_weather(location[1], location[2])
+
+        tasks = [asyncio.ensure_future(fetch(index, location)) for index, location in enumerate(locations)]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _fetch_or_last_good(self, endpoint, lat, lon):
+        """Return (payload, age_seconds); age is None for a fresh payload"""
+        try:
+            data = await self._fetch_endpoint(endpoint, lat, lon)
+            if data is not None:
+                return data, None
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            print(f"Weather API error ({endpoint}): {e}")
+
+        entry = await asyncio.to_thread(self.core.last_good.get, make_cache_key(endpoint, lat, lon))
+        if entry is None:
+            return None, None
+        return entry['data'], time.time() - entry['fetched_at']
+
+    async def _fetch_endpoint(self, endpoint, lat, lon):
+        """Fetch a raw OpenWeatherMap payload through the shared cache, limiter and breaker
+
+        The caches may read and write disk files, so they are used from worker threads.
+        """
+        key = make_cache_key(endpoint, lat, lon)
+        cached = await asyncio.to_thread(self.core.cache.get, key)
+        if cached is not None:
+            return cached
+
+        permit = self.core.breakers[endpoint].before_call()
+        fetch = lambda: self._fetch_upstream(endpoint, lat, lon, key, permit)
+        if permit == CircuitBreaker.PROBE and await asyncio.to_thread(self.core.last_good.get, key) is not None:
+            task = asyncio.ensure_future(self._revalidate(endpoint, key, fetch))
+            self._background.add(task)
+            task.add_done_callback(self._background.discard)
+            raise CircuitOpenError(f"Circuit '{endpoint}' is revalidating in the background")
+        return await self.flight.do(key, fetch)
+
+    async def _revalidate(self, endpoint, key, fetch):
+        try:
+            await self.flight.do(key, fetch)
+        except Exception as e:
+            print(f"Weather revalidation error ({endpoint}): {e}")
+
+    async def _fetch_upstream(self, endpoint, lat, lon, key, permit=CircuitBreaker.ALLOW):
+        # Another caller may have filled the cache while we were queued
+        cached = await asyncio.to_thread(self.core.cache.get, key)
+        if cached is not None:
+            return cached
+
+        # Queued callers give up as soon as the breaker opens, and calls
+        # admitted before it opened are re-checked once they hold a token
+        breaker = self.core.breakers[endpoint]
+        acquire = lambda: self.core.limiter.acquire_async(timeout=RATE_LIMIT_MAX_WAIT, check=breaker.check)
+        await acquire()
+        if permit == CircuitBreaker.ALLOW:
+            breaker.before_call()
+        url, params = self.core.upstream_request(endpoint, lat, lon)
+        try:
+            # Every retry is an upstream call too, so it takes its own token
+            status, data = await self.http.get_json(url, params=params, before_retry=acquire)
+        except (CircuitOpenError, RateLimitTimeout):
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        if status != 200:
+            breaker.record_failure()
+            return None
+
+        breaker.record_success()
+        await asyncio.to_thread(self.core.cache.set, key, data, WEATHER_CACHE_TTLS[endpoint])
+        await asyncio.to_thread(self.core.last_good.set, key, {'fetched_at': time.time(), 'data': data}, LAST_GOOD_TTL)
+        return data
+
+    async def close(self):
+        await self.http.close()
+
+
+class SyncWeatherFacade:
+    """Blocking WeatherService interface over an AsyncWeatherService
+
+    The async service runs on one event loop in a daemon thread, so any
+    thread (e.g. a Streamlit script run) can call it and hundreds of
+    requests still share one loop and connection pool.
+    """
+
+    def __init__(self, service=None):
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="async-weather", daemon=True)
+        self._thread.start()
+        # Created on the loop so its futures and session belong to it
+        self.service = service or self._call(self._create_service())
+
+    async def _create_service(self):
+        return AsyncWeatherService()
+
+    def _call(self, coroutine):
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def get_weather_data(self, lat, lon, county_name):
+        return self._call(self.service.get_weather_data(lat, lon, county_name))
+
+    def get_county_weather(self, county, coords):
+        return self._call(self.service.get_county_weather(county, coords))
+
+    def get_regional_data(self, counties_data, max_workers=ASYNC_REGIONAL_CONCURRENCY,
+                          sampling=REGIONAL_SAMPLING_MODE):
+        return self._call(self.service.get_regional_data(counties_data, max_workers, sampling))
+
+    def iter_regional_data(self, counties_data, max_workers=ASYNC_REGIONAL_CONCURRENCY):
+        """Yield counties as they complete; closing the generator cancels the rest"""
+        results = queue.Queue()
+        done = object()
+
+        async def produce():
+            try:
+                async for item in self.service.iter_regional_data(counties_data, max_workers):
+                    results.put(item)
+            finally:
+                results.put(done)
+
+        future = asyncio.run_coroutine_threadsafe(produce(), self._loop)
+        try:
+            while (item := results.get()) is not done:
+                yield item
+            future.result()
+        finally:
+            future.cancel()
+
+    def close(self):
+        self._call(self.service.close())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    def __getattr__(self, name):
+        # Synchronous helpers (detect_anomaly, build_regional_frame, ...) come from the shared core
+        return getattr(self.service.core, name)
+
+
+_sync_facade = None
+_sync_facade_lock = threading.Lock()
+
+
+def get_sync_weather_facade():
+    """Return the process-wide blocking facade over the async weather service"""
+    global _sync_facade
+    if _sync_facade is None:
+        with _sync_facade_lock:
+            if _sync_facade is None:
+                _sync_facade = SyncWeatherFacade()
+    return _sync_facade
@@ -0,0 +1,240 @@
+"""Headless nationwide risk report
+
+Computes weather, risk and satellite summaries for every county in worker
+processes (one task per state) and writes one partition file per state plus
+a run manifest. Meant to run from cron:
+
+    python batch_report.py --output reports --workers 4
+
+The dashboard's policy tab loads the latest report instead of fetching live.
+Every row records whether its weather was live, stale or mock; a run with
+any non-live county is 'partial', and one whose live share is below
+--min-live-coverage exits non-zero and does not replace the latest report.
+"""
+import argparse
+import importlib.util
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+import pandas as pd
+from config import BATCH_REPORT_DIR, BATCH_REPORT_WORKERS, BATCH_REPORT_MAX_AGE, BATCH_REPORT_KEEP_RUNS
+from config import BATCH_REPORT_MIN_LIVE_COVERAGE
+from config import OPENWEATHER_CALLS_PER_MINUTE, OPENWEATHER_BURST
+from county_registry import COUNTY_REGISTRY
+from resilience import TokenBucket
+from satellite_service import SatelliteService
+from weather_service import WeatherService
+
+# Indicator -> column prefix in the report
+INDICATOR_COLUMNS = {
+    "NDVI Analysis": "NDVI",
+    "Land Surface Temperature": "LST",
+    "Soil Moisture": "Soil_Moisture",
+    "Precipitation": "Precipitation"
+}
+
+# Values of the report's Source column
+WEATHER_SOURCES = ('live', 'stale', 'mock')
+
+MANIFEST_NAME = 'manifest.json'
+LATEST_NAME = 'latest.json'
+
+# Per-process services, created by _init_worker
+_weather_service = None
+_satellite_service = None
+
+
+def _init_worker(workers):
+    """Create this process's services with its share of the upstream rate limit"""
+    global _weather_service, _satellite_service
+    limiter = TokenBucket(OPENWEATHER_CALLS_PER_MINUTE / workers, max(1, OPENWEATHER_BURST // workers))
+    _weather_service = WeatherService(limiter=limiter)
+    _satellite_service = SatelliteService()
+
+
+def _report_state(state, counties):
+    """Report rows for one state's counties: weather, risk and satellite summaries"""
+    df = _weather_service.get_regional_data({state: counties})
+    for analysis_type, column in INDICATOR_COLUMNS.items():
+        summaries = [
+            _satellite_service.county_summary(analysis_type, county, coords)
+            for county, coords in counties.items()
+        ]
+        df[column] = [summary['current'] for summary in summaries]
+        df[f'{column}_30d_Mean'] = [summary['mean'] for summary in summaries]
+    return df
+
+
+def _prepare_shared_data(date):
+    """Build today's rasters and indicator history once, before workers read them"""
+    satellite_service = SatelliteService()
+    for analysis_type in INDICATOR_COLUMNS:
+        satellite_service.prepare_day(analysis_type, date)
+
+
+def _partition_name(state):
+    return 'state=' + re.sub(r'[^A-Za-z0-9]+', '_', state).strip('_')
+
+
+def _write_partition(df, directory, output_format):
+    """Write one partition file and return its path"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f'part-0.{output_format}')
+    if output_format == 'parquet':
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+    return path
+
+
+def _write_json(path, payload):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def resolve_format(requested):
+    """'parquet' when requested or available (pyarrow installed), otherwise 'csv'"""
+    has_parquet = importlib.util.find_spec('pyarrow') is not None
+    if requested == 'parquet' and not has_parquet:
+        raise ValueError("Parquet output needs pyarrow; install it or use --format csv")
+    if requested == 'auto':
+        return 'parquet' if has_parquet else 'csv'
+    return requested
+
+
+def run_report(output_dir=BATCH_REPORT_DIR, workers=BATCH_REPORT_WORKERS, output_format='auto',
+               keep_runs=BATCH_REPORT_KEEP_RUNS, min_live_coverage=BATCH_REPORT_MIN_LIVE_COVERAGE):
+    """Compute the nationwide report and return its manifest
+
+    The run is 'complete' only when every state was reported and every
+    county's weather was live. ``latest.json`` is updated only when the
+    share of live counties reaches ``min_live_coverage``.
+    """
+    started = time.monotonic()
+    created_at = datetime.now()
+    run_id = created_at.strftime('%Y%m%dT%H%M%S')
+    run_dir = os.path.join(output_dir, run_id)
+    output_format = resolve_format(output_format)
+    workers = max(1, min(workers, len(COUNTY_REGISTRY.state_names)))
+
+    _prepare_shared_data(created_at.date())
+
+    partitions, failed = {}, []
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(workers,)) as pool:
+        futures = {
+            pool.submit(_report_state, state, {
+                county: COUNTY_REGISTRY.coords(COUNTY_REGISTRY.county_id(county))
+                for county in COUNTY_REGISTRY.counties_in_state(state)
+            }): state
+            for state in COUNTY_REGISTRY.state_names
+        }
+        for future in as_completed(futures):
+            state = futures[future]
+            try:
+                df = future.result()
+                path = _write_partition(df, os.path.join(run_dir, _partition_name(state)), output_format)
+                partitions[state] = {
+                    'state': state,
+                    'path': os.path.relpath(path, run_dir),
+                    'rows': len(df),
+                    'bytes': os.path.getsize(path),
+                    'columns': list(df.columns),
+                    'sources': {source: int((df['Source'] == source).sum()) for source in WEATHER_SOURCES}
+                }
+            except Exception as e:
+                print(f"Batch report error ({state}): {e}")
+                failed.append({'state': state, 'error': str(e)})
+
+    sources = {source: sum(p['sources'][source] for p in partitions.values()) for source in WEATHER_SOURCES}
+    county_count = sum(p['rows'] for p in partitions.values())
+    # Counties in failed states count as not live
+    expected = sum(len(COUNTY_REGISTRY.counties_in_state(f['state'])) for f in failed) + county_count
+    live_coverage = sources['live'] / expected if expected else 0.0
+    manifest = {
+        'run_id': run_id,
+        'created_at': created_at.isoformat(timespec='seconds'),
+        'duration_seconds': round(time.monotonic() - started, 2),
+        'format': output_format,
+        'workers': workers,
+        'status': 'complete' if not failed and sources['live'] == county_count else 'partial',
+        'county_count': county_count,
+        'sources': sources,
+        'live_coverage': round(live_coverage, 4),
+        'min_live_coverage': min_live_coverage,
+        # Registry order, so the loaded frame matches the live one
+        'partitions': [partitions[state] for state in COUNTY_REGISTRY.state_names if state in partitions],
+        'failed': failed
+    }
+    os.makedirs(run_dir, exist_ok=True)
+    _write_json(os.path.join(run_dir, MANIFEST_NAME), manifest)
+    if partitions and live_coverage >= min_live_coverage:
+        _write_json(os.path.join(output_dir, LATEST_NAME), dict(manifest, run_dir=run_id))
+    if not failed:
+        _prune_runs(output_dir, keep_runs)
+    return manifest
+
+
+def _prune_runs(output_dir, keep_runs):
+    # Run directories are named by timestamp, so they sort oldest first
+    runs = sorted(
+        name for name in os.listdir(output_dir)
+        if os.path.isfile(os.path.join(output_dir, name, MANIFEST_NAME))
+    )
+    for name in runs[:-keep_runs] if keep_runs > 0 else []:
+        shutil.rmtree(os.path.join(output_dir, name), ignore_errors=True)
+
+
+def load_latest_report(output_dir=BATCH_REPORT_DIR, max_age=BATCH_REPORT_MAX_AGE):
+    """(manifest, DataFrame) of the newest report, or None if missing or older than ``max_age`` seconds"""
+    try:
+        with open(os.path.join(output_dir, LATEST_NAME), encoding='utf-8') as f:
+            manifest = json.load(f)
+        age = (datetime.now() - datetime.fromisoformat(manifest['created_at'])).total_seconds()
+        if max_age is not None and age > max_age:
+            return None
+
+        run_dir = os.path.join(output_dir, manifest['run_dir'])
+        reader = pd.read_parquet if manifest['format'] == 'parquet' else pd.read_csv
+        frames = [reader(os.path.join(run_dir, p['path'])) for p in manifest['partitions']]
+        return manifest, pd.concat(frames, ignore_index=True)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Batch report load error: {e}")
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Write the nationwide county risk report")
+    parser.add_argument('--output', default=BATCH_REPORT_DIR, help="report directory (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=BATCH_REPORT_WORKERS, help="worker processes")
+    parser.add_argument('--format', choices=['auto', 'csv', 'parquet'], default='auto',
+                        help="partition file format; auto uses Parquet when pyarrow is installed")
+    parser.add_argument('--keep-runs', type=int, default=BATCH_REPORT_KEEP_RUNS, help="runs to keep on disk")
+    parser.add_argument('--min-live-coverage', type=float, default=BATCH_REPORT_MIN_LIVE_COVERAGE,
+                        help="share of counties that must have live weather (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    try:
+        manifest = run_report(args.output, args.workers, args.format, args.keep_runs, args.min_live_coverage)
+    except Exception as e:
+        print(f"Batch report failed: {e}", file=sys.stderr)
+        return 2
+
+    print(f"Report {manifest['run_id']}: {manifest['county_count']} counties, "
+          f"{len(manifest['partitions'])} partitions, {manifest['status']} in {manifest['duration_seconds']}s, "
+          f"{manifest['live_coverage']:.0%} live ({manifest['sources']['stale']} stale, {manifest['sources']['mock']} mock)")
+    if manifest['failed'] or manifest['live_coverage'] < manifest['min_live_coverage']:
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
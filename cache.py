@@ -0,0 +1,141 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from config import CACHE_DIR, CACHE_MAX_ENTRIES, CACHE_COORD_PRECISION
+
+
+def make_cache_key(endpoint, lat, lon, precision=CACHE_COORD_PRECISION):
+    """Build a cache key from an endpoint name and quantized coordinates"""
+    return f"{endpoint}:{round(float(lat), precision):.{precision}f}:{round(float(lon), precision):.{precision}f}"
+
+
+class TwoTierCache:
+    """TTL cache with a bounded in-memory LRU tier backed by JSON files on disk
+
+    The memory tier is shared by every Streamlit session in the process; the
+    disk tier survives server restarts. Values must be JSON serializable.
+    """
+
+    def __init__(self, max_entries=CACHE_MAX_ENTRIES, disk_dir=CACHE_DIR):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._stats = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0,
+            'writes': 0
+        }
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    def get(self, key):
+        """Return the cached value for ``key`` or None when missing or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._entries.move_to_end(key)
+                    self._stats['memory_hits'] += 1
+                    return entry[1]
+                del self._entries[key]
+                self._stats['expirations'] += 1
+
+        entry = self._read_disk(key)
+        with self._lock:
+            if entry is not None and entry[0] > now:
+                self._store_memory(key, entry)
+                self._stats['disk_hits'] += 1
+                return entry[1]
+            self._stats['misses'] += 1
+        return None
+
+    def set(self, key, value, ttl):
+        """Store ``value`` in both tiers for ``ttl`` seconds"""
+        entry = (time.time() + ttl, value)
+        with self._lock:
+            self._store_memory(key, entry)
+            self._stats['writes'] += 1
+        self._write_disk(key, entry)
+
+    def clear(self):
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+        if self.disk_dir:
+            for name in os.listdir(self.disk_dir):
+                if name.endswith('.json'):
+                    try:
+                        os.remove(os.path.join(self.disk_dir, name))
+                    except OSError:
+                        pass
+
+    def stats(self):
+        """Hit/miss/eviction counters and the current memory tier size"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['memory_entries'] = len(self._entries)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['memory_hits'] + stats['disk_hits']) / lookups if lookups else 0.0
+        return stats
+
+    def _store_memory(self, key, entry):
+        # Caller holds self._lock
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._stats['evictions'] += 1
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.disk_dir, f"{digest}.json")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        try:
+            with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                payload = json.load(f)
+            return payload['expires_at'], payload['value']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _write_disk(self, key, entry):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'expires_at': entry[0], 'value': entry[1]}, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError) as e:
+            print(f"Cache write error for {key}: {e}")
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(name):
+    """Return the process-wide cache called ``name``, stored under CACHE_DIR/name"""
+    cache = _caches.get(name)
+    if cache is None:
+        with _caches_lock:
+            cache = _caches.get(name)
+            if cache is None:
+                cache = _caches[name] = TwoTierCache(disk_dir=os.path.join(CACHE_DIR, name))
+    return cache
+
+
+def get_weather_cache():
+    """Return the process-wide weather response cache"""
+    return get_cache('weather')
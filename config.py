@@ -31,3 +31,106 @@ DROUGHT_TEMP_THRESHOLD = 38
 DROUGHT_HUMIDITY_THRESHOLD = 30
 FLOOD_HUMIDITY_THRESHOLD = 80
 FLOOD_RAIN_THRESHOLD = 70
+
+# Regional fetch configuration
+REGIONAL_FETCH_WORKERS = 16  # Max concurrent county fetches for the policy dashboard
+# Regional sampling: 'county' fetches every county; 'cell' fetches one point per occupied
+# REGIONAL_SAMPLING_CELL_DEG cell and 'grid' the REGIONAL_GRID_STEP_DEG grid nodes around the
+# counties, interpolating county values from them
+REGIONAL_SAMPLING_MODE = os.getenv('SUDDAI_REGIONAL_SAMPLING', 'county')
+REGIONAL_SAMPLING_CELL_DEG = 1.0  # 75 counties -> 39 samples
+REGIONAL_GRID_STEP_DEG = 2.0  # 75 counties -> 26 grid nodes
+IDW_POWER = 2  # Inverse-distance weighting exponent
+IDW_NEIGHBOURS = 4  # Samples blended into each county in 'cell' mode
+ASYNC_WEATHER_ENABLED = os.getenv('SUDDAI_ASYNC_WEATHER', '0') == '1'  # Fetch weather on one asyncio event loop
+ASYNC_REGIONAL_CONCURRENCY = 128  # Max counties in flight at once on the event loop
+ASYNC_HTTP_MAX_CONNECTIONS = 100  # Pooled aiohttp connections shared by all in-flight requests
+
+# HTTP transport configuration (shared by weather and satellite services)
+HTTP_CONNECT_TIMEOUT = 3.05  # Seconds to establish a connection
+HTTP_READ_TIMEOUT = 10  # Seconds to wait for a response
+HTTP_MAX_RETRIES = 3
+HTTP_BACKOFF_FACTOR = 0.5  # Exponential backoff base in seconds
+HTTP_BACKOFF_JITTER = 0.5  # Random jitter added to each backoff, in seconds
+HTTP_DEFAULT_POOL_SIZE = 10  # Keep-alive connections per host
+HTTP_HOST_POOL_SIZES = {
+    "api.openweathermap.org": REGIONAL_FETCH_WORKERS * 2,  # Current weather + forecast per county
+    "api.nasa.gov": 4
+}
+
+# Weather response cache
+CACHE_DIR = os.getenv('SUDDAI_CACHE_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'))
+CACHE_MAX_ENTRIES = 512  # In-memory LRU entries shared by all sessions
+CACHE_COORD_PRECISION = 2  # Decimal places kept when quantizing lat/lon (~1 km)
+WEATHER_CACHE_TTLS = {
+    "weather": 10 * 60,  # Current conditions
+    "forecast": 60 * 60  # 5-day / 3-hour forecast
+}
+
+# Upstream rate limiting (OpenWeatherMap free tier allows 60 calls/minute)
+OPENWEATHER_CALLS_PER_MINUTE = 60
+OPENWEATHER_BURST = 10  # Calls allowed back-to-back before throttling kicks in
+RATE_LIMIT_MAX_WAIT = 120  # Seconds a queued caller waits for its turn before giving up
+
+# Background nationwide snapshot refresh
+SNAPSHOT_SCHEDULER_ENABLED = os.getenv('SUDDAI_SNAPSHOT_SCHEDULER', '1') != '0'
+SNAPSHOT_REFRESH_INTERVAL = 15 * 60  # Seconds between nationwide refreshes
+SNAPSHOT_COUNTY_STAGGER = 2 * 60 / OPENWEATHER_CALLS_PER_MINUTE  # Seconds between counties (2 calls each)
+
+# Upstream failure handling
+CIRCUIT_FAILURE_THRESHOLD = 5  # Consecutive failures before an endpoint's breaker opens
+CIRCUIT_RECOVERY_TIMEOUT = 60  # Seconds an open breaker waits before allowing a probe
+LAST_GOOD_TTL = 7 * 24 * 60 * 60  # How long a last known good response may be served as stale
+
+# Location map neighbours (found through the county spatial index)
+MAP_NEIGHBOUR_RADIUS_KM = 150
+MAP_MAX_NEIGHBOURS = 12
+POLICY_STREAM_REFRESH_SECONDS = 0.5  # Min seconds between policy dashboard redraws while counties stream in
+
+# Chart figures, shared across sessions and keyed by a hash of their inputs
+FIGURE_CACHE_MAX_ENTRIES = 256
+
+# Print render timings and sizes to the server log
+DEBUG_TELEMETRY = os.getenv('SUDDAI_DEBUG', '0') == '1'
+
+# Tab execution
+LAZY_TABS = True  # Only run the selected tab's data work on each rerun
+TAB_MEMO_TTL = 10 * 60  # Seconds a tab's memoized data stays valid for a session
+TAB_MEMO_MAX_ENTRIES = 32  # Memoized (tab, inputs) results kept per session
+
+# Synthetic (fallback/mock) data
+SYNTHETIC_DATA_SALT = os.getenv('SUDDAI_SYNTHETIC_SALT', 'suddai-v1')  # Change to get a different but stable dataset
+
+# Satellite raster tile store (national float32 grids per indicator and date)
+RASTER_BOUNDS = {"lat_min": 3.0, "lat_max": 12.5, "lon_min": 23.5, "lon_max": 36.0}  # Covers South Sudan
+RASTER_RESOLUTION = 0.02  # Degrees per cell (~2 km)
+RASTER_WINDOW_CACHE_SIZE = 64  # Hot county windows kept in memory
+RASTER_RETENTION_DAYS = 30  # Older daily grids are pruned from disk
+COUNTY_WINDOW_EXTENT = 0.3  # Degrees around a county shown in the satellite view
+NATIONAL_VIEW_CELLS = 50  # Approximate cells per axis for the national overview
+COUNTY_VIEW_CELLS = 30  # Approximate cells per axis for a county window
+
+# Daily indicator history (append-only, per county)
+TIMESERIES_HISTORY_DAYS = 5 * 365  # Days of history a new indicator starts with
+TIMESERIES_DEFAULT_DAYS = 30  # Default range shown in the satellite tab
+TIME_SERIES_MAX_POINTS = 600  # Max points per chart trace (about one per pixel); longer series are downsampled
+
+# Headless batch reports (python batch_report.py)
+BATCH_REPORT_DIR = os.getenv('SUDDAI_REPORT_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'reports'))
+BATCH_REPORT_WORKERS = os.cpu_count() or 1  # Worker processes; each takes a share of the API rate limit
+BATCH_REPORT_MAX_AGE = 6 * 60 * 60  # Reports older than this are not shown on the dashboard
+BATCH_REPORT_KEEP_RUNS = 14  # Older runs are deleted after a successful run
+BATCH_REPORT_MIN_LIVE_COVERAGE = 0.9  # Runs with a smaller share of live (not stale/mock) counties exit non-zero and are not published
+
+# JSON API server (python api_server.py)
+API_HOST = os.getenv('SUDDAI_API_HOST', '127.0.0.1')
+API_PORT = int(os.getenv('SUDDAI_API_PORT', '8080'))
+API_RESPONSE_TTL = 60  # Seconds an encoded response (and its ETag) is served from memory
+API_RESPONSE_CACHE_SIZE = 4096  # Encoded responses kept in memory
+API_MAX_HEADER_BYTES = 16 * 1024  # Larger request headers are rejected
+
+# NASA imagery tiles
+NASA_IMAGERY_DIM = 0.1  # Tile width/height in degrees
+NASA_IMAGERY_LAG_DAYS = 16  # Most recent composite available
+NASA_IMAGERY_FAILURE_TTL = 300  # Seconds a failed tile download is not retried
+SATELLITE_PLOT_CELL_BUDGET = 160 * 160  # Max heatmap cells sent to the browser; larger rasters are block-averaged
@@ -0,0 +1,93 @@
+import numpy as np
+from data import SOUTH_SUDAN_COUNTIES
+
+
+class CountyRegistry:
+    """Compact, array-backed view of the county table, built once
+
+    Counties get integer ids in state/county order. Coordinates live in
+    contiguous float arrays and each state's counties occupy the id range
+    ``state_offsets[code]:state_offsets[code + 1]``. The nested dict the
+    registry was built from stays available as ``counties_data``.
+    """
+
+    def __init__(self, counties_data):
+        self.counties_data = counties_data
+        self.state_names = tuple(counties_data.keys())
+        self.county_names = tuple(county for counties in counties_data.values() for county in counties)
+        self.n_states = len(self.state_names)
+        self.n_counties = len(self.county_names)
+
+        coords = [c for counties in counties_data.values() for c in counties.values()]
+        self.lat = np.ascontiguousarray([c['lat'] for c in coords], dtype=np.float64)
+        self.lon = np.ascontiguousarray([c['lon'] for c in coords], dtype=np.float64)
+
+        self.state_counts = np.array([len(counties) for counties in counties_data.values()], dtype=np.int32)
+        self.state_offsets = np.zeros(self.n_states + 1, dtype=np.int32)
+        np.cumsum(self.state_counts, out=self.state_offsets[1:])
+        self.state_codes = np.repeat(np.arange(self.n_states, dtype=np.int16), self.state_counts)
+
+        self.state_index = {state: code for code, state in enumerate(self.state_names)}
+        self.county_index = {county: i for i, county in enumerate(self.county_names)}
+        if len(self.county_index) != self.n_counties:
+            raise ValueError("County names must be unique across states")
+
+        self._locations = tuple(
+            (self.state_names[self.state_codes[i]], self.county_names[i], coords[i])
+            for i in range(self.n_counties)
+        )
+
+    def __len__(self):
+        return self.n_counties
+
+    def state_code(self, state):
+        """Integer code of a state name"""
+        return self.state_index[state]
+
+    def county_id(self, county):
+        """Integer id of a county name"""
+        return self.county_index[county]
+
+    def state_of(self, county_id):
+        """State name of a county id"""
+        return self.state_names[self.state_codes[county_id]]
+
+    def coords(self, county_id):
+        """Coordinates of a county id as a {'lat', 'lon'} dict"""
+        return self._locations[county_id][2]
+
+    def county_ids_in_state(self, state):
+        """Id range of a state's counties"""
+        code = self.state_index[state]
+        return range(self.state_offsets[code], self.state_offsets[code + 1])
+
+    def counties_in_state(self, state):
+        """County names of a state, in registry order"""
+        ids = self.county_ids_in_state(state)
+        return self.county_names[ids.start:ids.stop]
+
+    def county_count(self, state=None):
+        """Number of counties in ``state``, or nationwide when omitted"""
+        if state is None:
+            return self.n_counties
+        return int(self.state_counts[self.state_index[state]])
+
+    def locations(self):
+        """All counties as (state, county, coords) tuples in registry order"""
+        return self._locations
+
+
+def county_locations(counties_data):
+    """(state, county, coords) tuples for a CountyRegistry, a nested county dict or such a list"""
+    if isinstance(counties_data, CountyRegistry):
+        return counties_data.locations()
+    if isinstance(counties_data, (list, tuple)):
+        return list(counties_data)
+    return [
+        (state, county, coords)
+        for state, counties in counties_data.items()
+        for county, coords in counties.items()
+    ]
+
+
+COUNTY_REGISTRY = CountyRegistry(SOUTH_SUDAN_COUNTIES)
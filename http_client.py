@@ -0,0 +1,127 @@
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from config import HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT, HTTP_MAX_RETRIES, HTTP_BACKOFF_FACTOR
+from config import HTTP_BACKOFF_JITTER, HTTP_DEFAULT_POOL_SIZE, HTTP_HOST_POOL_SIZES
+
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+def retry_backoff(attempt, retry_after=None):
+    """Seconds to wait before retry ``attempt`` (0-based): jittered exponential, at least Retry-After"""
+    backoff = HTTP_BACKOFF_FACTOR * 2 ** attempt + random.uniform(0, HTTP_BACKOFF_JITTER)
+    if retry_after and retry_after.isdigit():
+        backoff = max(backoff, int(retry_after))
+    return backoff
+
+
+class HttpClient:
+    """Keep-alive HTTP transport with timeouts and jittered retries
+
+    One ``requests.Session`` is shared by every caller, with a dedicated
+    connection pool per upstream host so a slow host cannot starve the others.
+    Retries happen here rather than inside urllib3, so callers can see (and
+    rate-limit) every upstream attempt.
+    """
+
+    def __init__(self, connect_timeout=HTTP_CONNECT_TIMEOUT, read_timeout=HTTP_READ_TIMEOUT,
+                 max_retries=HTTP_MAX_RETRIES, host_pool_sizes=None):
+        self.timeout = (connect_timeout, read_timeout)
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        self._adapters = {}
+        self._lock = threading.Lock()
+        self._request_count = 0
+        self._retry_count = 0
+
+        default_adapter = self._make_adapter(HTTP_DEFAULT_POOL_SIZE)
+        self.session.mount("http://", default_adapter)
+        self.session.mount("https://", default_adapter)
+        self._adapters['*'] = default_adapter
+
+        for host, pool_size in (host_pool_sizes or HTTP_HOST_POOL_SIZES).items():
+            adapter = self._make_adapter(pool_size)
+            self.session.mount(f"http://{host}", adapter)
+            self.session.mount(f"https://{host}", adapter)
+            self._adapters[host] = adapter
+
+    def _make_adapter(self, pool_size):
+        """Create an adapter whose pool keeps up to ``pool_size`` idle connections"""
+        return HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+
+    def get(self, url, params=None, timeout=None, before_retry=None, **kwargs):
+        """Issue a GET on the pooled session, always with a timeout
+
+        Connection errors, timeouts and 429/5xx responses are retried up to
+        ``max_retries`` times with retry_backoff(). ``before_retry`` is called
+        before each retry, e.g. to take another rate limit token; an exception
+        it raises ends the retries.
+        """
+        with self._lock:
+            self._request_count += 1
+        for attempt in range(self.max_retries + 1):
+            try:
+                response = self.session.get(url, params=params, timeout=timeout or self.timeout, **kwargs)
+                if response.status_code not in RETRY_STATUS_CODES or attempt == self.max_retries:
+                    return response
+                retry_after = response.headers.get('Retry-After')
+                response.close()
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt == self.max_retries:
+                    raise
+                retry_after = None
+
+            with self._lock:
+                self._retry_count += 1
+            time.sleep(retry_backoff(attempt, retry_after))
+            if before_retry is not None:
+                before_retry()
+
+    def get_metrics(self):
+        """Connection pool statistics, including how often connections were reused"""
+        pools = []
+        for name, adapter in self._adapters.items():
+            container = adapter.poolmanager.pools
+            for key in container.keys():
+                pool = container.get(key)
+                if pool is None:
+                    continue
+                pools.append({
+                    'adapter': name,
+                    'host': pool.host,
+                    'port': pool.port,
+                    'requests': pool.num_requests,
+                    'connections_opened': pool.num_connections,
+                    'connections_reused': max(0, pool.num_requests - pool.num_connections)
+                })
+
+        total_requests = sum(p['requests'] for p in pools)
+        total_opened = sum(p['connections_opened'] for p in pools)
+        return {
+            'calls': self._request_count,
+            'retries': self._retry_count,
+            'requests': total_requests,
+            'connections_opened': total_opened,
+            'connections_reused': max(0, total_requests - total_opened),
+            'reuse_ratio': (total_requests - total_opened) / total_requests if total_requests else 0.0,
+            'pools': pools
+        }
+
+    def close(self):
+        self.session.close()
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """Return the process-wide HTTP client shared by all services"""
+    global _shared_client
+    if _shared_client is None:
+        with _shared_client_lock:
+            if _shared_client is None:
+                _shared_client = HttpClient()
+    return _shared_client
@@ -0,0 +1,135 @@
+import io
+import os
+import threading
+import time
+import numpy as np
+from PIL import Image
+from config import CACHE_DIR, NASA_IMAGERY_FAILURE_TTL
+
+
+def decode_image(content):
+    """Decode encoded image bytes (PNG/JPEG) into an (H, W, 3) uint8 RGB array
+
+    The encoded bytes are wrapped, not copied. The decoded pixels are
+    copied once more into the returned array (Pillow exports its buffer
+    through ``tobytes()``).
+    """
+    with Image.open(io.BytesIO(content)) as image:
+        if image.mode != 'RGB':
+            image = image.convert('RGB')
+        return np.asarray(image)
+
+
+def vegetation_index(rgb):
+    """Visible-band vegetation index in [-1, 1] from an RGB tile
+
+    The earth imagery endpoint serves true-colour composites without a
+    near-infrared band, so NDVI is approximated by the green-red normalized
+    difference (G - R) / (G + R), computed in float32.
+    """
+    red = rgb[..., 0].astype(np.float32)
+    green = rgb[..., 1].astype(np.float32)
+    total = green + red
+    index = np.zeros_like(total)
+    np.divide(green - red, total, out=index, where=total > 0)
+    return index
+
+
+INDICATOR_DECODERS = {
+    "NDVI Analysis": vegetation_index
+}
+
+
+class ImageryTileCache:
+    """Decoded imagery tiles on disk, keyed by (lat, lon, dim, date)
+
+    Tiles are stored as raw ``.npy`` arrays and memory-mapped on read, so a
+    cached tile costs no decode and no copy. Failed downloads are remembered
+    in memory for ``failure_ttl`` seconds so they are not retried on every view.
+    """
+
+    def __init__(self, root=os.path.join(CACHE_DIR, 'imagery'), failure_ttl=NASA_IMAGERY_FAILURE_TTL):
+        self.root = root
+        self.failure_ttl = failure_ttl
+        self._failures = {}  # (lat, lon, dim, date) -> monotonic time until which fetches are skipped
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'decodes': 0, 'failures': 0, 'failure_hits': 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, lat, lon, dim, date):
+        return os.path.join(self.root, f"{lat:.4f}_{lon:.4f}_{dim:.3f}_{date}.npy")
+
+    def get(self, lat, lon, dim, date):
+        """The cached tile as a read-only memmap, or None"""
+        path = self._path(lat, lon, dim, date)
+        try:
+            tile = np.load(path, mmap_mode='r')
+        except (OSError, ValueError):
+            tile = None
+        with self._lock:
+            self._stats['hits' if tile is not None else 'misses'] += 1
+        return tile
+
+    def put(self, lat, lon, dim, date, content):
+        """Decode image bytes, store the tile and return it memory-mapped"""
+        rgb = decode_image(content)
+        path = self._path(lat, lon, dim, date)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+        np.save(tmp_path, rgb)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._stats['decodes'] += 1
+        return np.load(path, mmap_mode='r')
+
+    def get_or_fetch(self, lat, lon, dim, date, fetch):
+        """Return the tile, calling ``fetch()`` for the encoded bytes on a miss
+
+        ``fetch`` returns the image bytes, or None when the image is not
+        available. A None or an exception from ``fetch`` is remembered for
+        ``failure_ttl`` seconds, during which None is returned without fetching.
+        """
+        tile = self.get(lat, lon, dim, date)
+        if tile is not None:
+            return tile
+
+        key = (lat, lon, dim, date)
+        with self._lock:
+            if self._failures.get(key, 0) > time.monotonic():
+                self._stats['failure_hits'] += 1
+                return None
+        try:
+            content = fetch()
+        except Exception:
+            self._remember_failure(key)
+            raise
+        if content is None:
+            self._remember_failure(key)
+            return None
+        return self.put(lat, lon, dim, date, content)
+
+    def _remember_failure(self, key):
+        now = time.monotonic()
+        with self._lock:
+            self._stats['failures'] += 1
+            self._failures[key] = now + self.failure_ttl
+            # Drop expired entries so the map only holds recent failures
+            for stale in [k for k, until in self._failures.items() if until <= now]:
+                del self._failures[stale]
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+_tile_cache = None
+_tile_cache_lock = threading.Lock()
+
+
+def get_imagery_cache():
+    """Return the process-wide imagery tile cache"""
+    global _tile_cache
+    if _tile_cache is None:
+        with _tile_cache_lock:
+            if _tile_cache is None:
+                _tile_cache = ImageryTileCache()
+    return _tile_cache
@@ -1,16 +1,23 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import time
 
 # Import our custom modules
 from config import APP_TITLE, APP_ICON, DEFAULT_STATE, DEFAULT_COUNTY, MAP_HEIGHT, MAP_WIDTH
-from data import SOUTH_SUDAN_COUNTIES
+from config import SNAPSHOT_SCHEDULER_ENABLED, POLICY_STREAM_REFRESH_SECONDS, ASYNC_WEATHER_ENABLED
+from config import LAZY_TABS, TAB_MEMO_TTL, TAB_MEMO_MAX_ENTRIES, DEBUG_TELEMETRY
+from config import TIMESERIES_HISTORY_DAYS, TIMESERIES_DEFAULT_DAYS, TIME_SERIES_MAX_POINTS
+from config import REGIONAL_SAMPLING_MODE
+from county_registry import COUNTY_REGISTRY
 from weather_service import WeatherService
 from satellite_service import SatelliteService
 from map_service import MapService
 from ui_components import UIComponents
+from scheduler import SnapshotScheduler
+from batch_report import load_latest_report
 
 # Disable Streamlit email requirement
 os.environ['STREAMLIT_DISABLE_EMAIL'] = '1'
@@ -24,11 +31,59 @@ st.set_page_config(
 )
 
 # Initialize services
-weather_service = WeatherService()
+if ASYNC_WEATHER_ENABLED:
+    from async_weather_service import get_sync_weather_facade
+    weather_service = get_sync_weather_facade()
+else:
+    weather_service = WeatherService()
 satellite_service = SatelliteService()
 map_service = MapService()
 ui = UIComponents()
 
+@st.cache_resource
+def get_snapshot_scheduler():
+    """Start one background snapshot scheduler per server process"""
+    return SnapshotScheduler(WeatherService(), COUNTY_REGISTRY).start()
+
+def get_weather_snapshot():
+    """Latest nationwide weather snapshot, or None if not yet available"""
+    if not SNAPSHOT_SCHEDULER_ENABLED:
+        return None
+    return get_snapshot_scheduler().snapshot
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_batch_report():
+    """Latest batch_report.py output as (manifest, frame), or None"""
+    return load_latest_report()
+
+def create_tabs(labels):
+    """Create the main tabs, tracking the selected one when lazy tabs are enabled"""
+    if LAZY_TABS:
+        try:
+            return st.tabs(labels, key='main_tabs', on_change='rerun')
+        except TypeError:
+            pass  # Streamlit without lazy tab support renders every tab
+    return st.tabs(labels)
+
+def tab_is_open(tab):
+    """Whether a tab is selected; always true when selection is not tracked"""
+    return getattr(tab, 'open', None) is not False
+
+def tab_memo(tab, inputs, compute, ttl=TAB_MEMO_TTL):
+    """Memoize a tab's data per session and input so switching back is instant"""
+    memo = st.session_state.setdefault('tab_memo', {})
+    key = (tab, inputs)
+    entry = memo.get(key)
+    if entry is not None and time.monotonic() - entry[0] < ttl:
+        return entry[1]
+
+    value = compute()
+    memo.pop(key, None)
+    memo[key] = (time.monotonic(), value)
+    while len(memo) > TAB_MEMO_MAX_ENTRIES:
+        memo.pop(next(iter(memo)))
+    return value
+
 def main():
     # Render header
     ui.render_header("SuddAi - an AgriWatch ai for South Sudan",
@@ -37,41 +92,58 @@ def main():
     # Sidebar
     st.sidebar.header("📍 Location Selection")
 
+    # Apply a county picked on the map during the previous run
+    pending = st.session_state.pop('pending_selection', None)
+    if pending:
+        st.session_state.selected_state, st.session_state.selected_county = pending
+    st.session_state.setdefault('selected_state', DEFAULT_STATE)
+    st.session_state.setdefault('selected_county', DEFAULT_COUNTY)
+
     # State and county selection
     selected_state = st.sidebar.selectbox(
         "Select State:",
-        list(SOUTH_SUDAN_COUNTIES.keys()),
-        index=list(SOUTH_SUDAN_COUNTIES.keys()).index(DEFAULT_STATE)
+        COUNTY_REGISTRY.state_names,
+        key='selected_state'
     )
 
+    state_counties = COUNTY_REGISTRY.counties_in_state(selected_state)
+    if st.session_state.get('selected_county') not in state_counties:
+        st.session_state.selected_county = state_counties[0]
     selected_county = st.sidebar.selectbox(
         "Select County:",
-        list(SOUTH_SUDAN_COUNTIES[selected_state].keys()),
-        index=0
+        state_counties,
+        key='selected_county'
     )
 
     # Show county info in sidebar
     st.sidebar.markdown("---")
     st.sidebar.markdown("### 📊 Quick Info")
-    coords = SOUTH_SUDAN_COUNTIES[selected_state][selected_county]
+    coords = COUNTY_REGISTRY.coords(COUNTY_REGISTRY.county_id(selected_county))
     st.sidebar.markdown(f"**Coordinates:** {coords['lat']:.3f}, {coords['lon']:.3f}")
-    st.sidebar.markdown(f"**Counties in {selected_state}:** {len(SOUTH_SUDAN_COUNTIES[selected_state])}")
-    st.sidebar.markdown(f"**Total Counties:** {sum(len(counties) for counties in SOUTH_SUDAN_COUNTIES.values())}")
+    st.sidebar.markdown(f"**Counties in {selected_state}:** {COUNTY_REGISTRY.county_count(selected_state)}")
+    st.sidebar.markdown(f"**Total Counties:** {COUNTY_REGISTRY.county_count()}")
 
     # Main content tabs
-    tab1, tab2, tab3, tab4 = st.tabs(["🏠 Dashboard", "🛰️ Satellite View", "📊 Policy Dashboard", "ℹ️ About"])
+    tab1, tab2, tab3, tab4 = create_tabs(["🏠 Dashboard", "🛰️ Satellite View", "📊 Policy Dashboard", "ℹ️ About"])
 
     with tab1:
-        render_dashboard_tab(selected_state, selected_county, coords)
+        if tab_is_open(tab1):
+            render_dashboard_tab(selected_state, selected_county, coords)
 
     with tab2:
-        render_satellite_tab(selected_county, selected_state)
+        if tab_is_open(tab2):
+            render_satellite_tab(selected_county, selected_state)
 
     with tab3:
-        render_policy_tab()
+        if tab_is_open(tab3):
+            render_policy_tab()
 
     with tab4:
-        render_about_tab()
+        if tab_is_open(tab4):
+            render_about_tab()
+
+    if DEBUG_TELEMETRY:
+        ui.render_chart_timings()
 
 def render_dashboard_tab(selected_state, selected_county, coords):
     """Render the main dashboard tab"""
@@ -80,12 +152,19 @@ def render_dashboard_tab(selected_state, selected_county, coords):
     with col1:
         st.subheader(f"Weather Monitor - {selected_county}, {selected_state}")
 
-        # Get weather data
-        weather_data = weather_service.get_weather_data(coords['lat'], coords['lon'], selected_county)
-        anomaly = weather_service.detect_anomaly(selected_county, weather_data)
+        # Get weather data (from the background snapshot when available)
+        snapshot = get_weather_snapshot()
+        snapshot_time = snapshot.created_at if snapshot else None
+        weather_data, anomaly = tab_memo(
+            'dashboard', (selected_county, snapshot_time),
+            lambda: load_dashboard_data(selected_county, coords, snapshot)
+        )
 
         # Current weather metrics
         st.markdown("### 🌤️ Current Conditions")
+        if weather_data.get('stale'):
+            st.warning(f"Live weather is unavailable; showing the last known data from "
+                       f"{weather_data['age_seconds'] / 60:.0f} minutes ago.")
         ui.render_weather_metrics(weather_data)
 
         # Anomaly detection
@@ -96,7 +175,7 @@ def render_dashboard_tab(selected_state, selected_county, coords):
         st.markdown("### 📅 5-Day Forecast")
 
         # Temperature forecast
-        fig_temp = ui.render_forecast_chart(weather_data['forecast'])
+        fig_temp = ui.render_forecast_chart(weather_data['forecast'], weather_data.get('hourly'))
         st.plotly_chart(fig_temp, use_container_width=True)
 
         # Rainfall probability
@@ -107,11 +186,13 @@ def render_dashboard_tab(selected_state, selected_county, coords):
         st.subheader("🗺️ Location Map")
 
         # Create and render map with increased size
+        show_all_counties = st.checkbox("Show all counties", key='map_show_all_counties')
         m = map_service.create_location_map(
-            coords, selected_county, selected_state, 
-            SOUTH_SUDAN_COUNTIES[selected_state], anomaly['color']
+            coords, selected_county, selected_state, anomaly['color'], show_all_counties
         )
-        map_service.render_map(m, height=MAP_HEIGHT, width=MAP_WIDTH)
+        map_state = map_service.render_map(m, height=MAP_HEIGHT, width=MAP_WIDTH, key='location_map')
+        st.caption("Click the map to select the nearest county.")
+        handle_map_click(map_state, selected_county)
 
         # Farming advisory
         st.markdown("### 🌱 Farming Advisory")
@@ -120,7 +201,7 @@ def render_dashboard_tab(selected_state, selected_county, coords):
         # Quick stats
         st.markdown("### 📈 Quick Stats")
         forecast_data = weather_data['forecast']
-        avg_temp = np.mean([(f['max_temp'] + f['min_temp']) / 2 for f in forecast_data])
+        avg_temp = np.mean([f['mean_temp'] for f in forecast_data])
         avg_humidity = np.mean([f['humidity'] for f in forecast_data])
         total_rain_prob = np.mean([f['rainfall_prob'] for f in forecast_data])
 
@@ -128,6 +209,32 @@ def render_dashboard_tab(selected_state, selected_county, coords):
         st.metric("Avg Humidity (5-day)", f"{avg_humidity:.1f}%")
         st.metric("Avg Rain Probability", f"{total_rain_prob:.1f}%")
 
+def load_dashboard_data(selected_county, coords, snapshot):
+    """Weather and anomaly for the dashboard tab"""
+    weather_data = snapshot.weather.get(selected_county) if snapshot else None
+    if weather_data is None:
+        weather_data = weather_service.get_weather_data(coords['lat'], coords['lon'], selected_county)
+    return weather_data, weather_service.detect_anomaly(selected_county, weather_data)
+
+def handle_map_click(map_state, selected_county):
+    """Select the county nearest to a new map click"""
+    if not map_state:
+        return
+    new_clicks = []
+    for field in ('last_object_clicked', 'last_clicked'):
+        clicked = map_state.get(field)
+        if clicked and clicked != st.session_state.get(f'map_{field}'):
+            st.session_state[f'map_{field}'] = clicked
+            new_clicks.append(clicked)
+    if not new_clicks:
+        return
+
+    # A marker click is more precise than a click on the map background
+    county, state, _ = map_service.county_at(new_clicks[0]['lat'], new_clicks[0]['lng'])
+    if county != selected_county:
+        st.session_state.pending_selection = (state, county)
+        st.rerun()
+
 def render_satellite_tab(selected_county, selected_state):
     """Render satellite analysis tab"""
     st.subheader(f"🛰️ Satellite Image Analysis - {selected_county}, {selected_state}")
@@ -142,11 +249,22 @@ def render_satellite_tab(selected_county, selected_state):
             ["NDVI Analysis", "Land Surface Temperature", "Soil Moisture", "Precipitation"]
         )
 
+        # Apply a range zoomed to on the trend chart during the previous run
+        today = datetime.now().date()
+        pending = st.session_state.pop('pending_date_range', None)
+        if pending:
+            st.session_state.satellite_date_range = pending
+        st.session_state.setdefault('satellite_date_range', (today - timedelta(days=TIMESERIES_DEFAULT_DAYS), today))
         date_range = st.date_input(
             "Select Date Range:",
-            value=datetime.now().date(),
-            max_value=datetime.now().date()
+            min_value=today - timedelta(days=TIMESERIES_HISTORY_DAYS - 1),
+            max_value=today,
+            key='satellite_date_range'
         )
+        # While a range is being picked only its start is set
+        if not isinstance(date_range, (list, tuple)):
+            date_range = (date_range,)
+        start_date, end_date = (date_range[0], date_range[-1]) if date_range else (today, today)
 
     with col_info:
         st.markdown("### 📊 Analysis Info")
@@ -173,29 +291,137 @@ def render_satellite_tab(selected_county, selected_state):
 
     with col1:
         # Generate and display satellite data for selected county
-        coords = SOUTH_SUDAN_COUNTIES[selected_state][selected_county]
-        data, color_scale, title, color_label = satellite_service.generate_satellite_data(
-            analysis_type, coords, selected_county
+        fig, fig_time, series_stats = tab_memo(
+            'satellite', (analysis_type, selected_county, start_date, end_date),
+            lambda: load_satellite_figures(analysis_type, selected_county, start_date, end_date)
         )
-        fig = satellite_service.create_satellite_plot(data, color_scale, title, color_label)
         st.plotly_chart(fig, use_container_width=True)
 
     with col2:
         # Time series analysis
         st.markdown(f"### 📈 Temporal Analysis - {selected_county}")
-        time_series_df, ylabel = satellite_service.generate_time_series(analysis_type, selected_county)
-
-        fig_time = satellite_service.create_time_series_plot(time_series_df, analysis_type)
-        st.plotly_chart(fig_time, use_container_width=True)
+        trend_state = st.plotly_chart(
+            fig_time, use_container_width=True, key='satellite_trend', on_select='rerun', selection_mode='box'
+        )
+        st.caption(f"{series_stats['rendered_points']} of {series_stats['source_points']} daily points · "
+                   f"box-select to zoom in")
+        handle_trend_zoom(trend_state, start_date, end_date)
+
+def handle_trend_zoom(trend_state, start_date, end_date):
+    """Re-query the trend at full resolution for a new box selection"""
+    boxes = (trend_state or {}).get('selection', {}).get('box') or []
+    if not boxes or boxes[-1] == st.session_state.get('trend_zoom_box'):
+        return
+    st.session_state.trend_zoom_box = boxes[-1]
+
+    x_range = sorted(pd.Timestamp(x) for x in boxes[-1]['x'])
+    zoom_start = max(x_range[0].date(), start_date)
+    zoom_end = min(x_range[-1].date(), end_date)
+    if zoom_start < zoom_end and (zoom_start, zoom_end) != (start_date, end_date):
+        st.session_state.pending_date_range = (zoom_start, zoom_end)
+        st.rerun()
+
+def load_satellite_figures(analysis_type, selected_county, start_date=None, end_date=None):
+    """Raster and time series figures for the satellite tab"""
+    coords = COUNTY_REGISTRY.coords(COUNTY_REGISTRY.county_id(selected_county))
+    data, color_scale, title, color_label = satellite_service.generate_satellite_data(
+        analysis_type, coords, selected_county
+    )
+    fig = satellite_service.create_satellite_plot(data, color_scale, title, color_label)
+    if DEBUG_TELEMETRY:
+        stats = satellite_service.last_plot_stats
+        rows, cols = stats['rendered_shape']
+        print(f"Satellite plot {analysis_type}/{selected_county}: {rows}x{cols} cells "
+              f"(downsampled x{stats['downsample_factor']}), {stats['data_bytes'] / 1024:.0f} KB z, "
+              f"built in {stats['build_ms']:.0f} ms")
+
+    time_series_df, ylabel = satellite_service.generate_time_series(
+        analysis_type, selected_county, start_date, end_date
+    )
+    date_range = (start_date, end_date) if start_date and end_date else None
+    fig_time = satellite_service.create_time_series_plot(
+        time_series_df, analysis_type, date_range, max_points=TIME_SERIES_MAX_POINTS
+    )
+    return fig, fig_time, satellite_service.last_series_stats
 
 def render_policy_tab():
     """Render policy dashboard tab"""
     st.subheader("📊 Policy Dashboard - Regional Overview")
     st.markdown("*Aggregated data for policymakers and government officials*")
 
-    # Get regional data
-    df = weather_service.get_regional_data(SOUTH_SUDAN_COUNTIES)
-
+    # Get regional data (from the background snapshot when available)
+    snapshot = get_weather_snapshot()
+    if snapshot is not None:
+        st.caption(f"Data as of {snapshot.created_at:%Y-%m-%d %H:%M}")
+        render_interpolation_caption(snapshot.regional)
+        render_policy_content(snapshot.regional)
+        return
+
+    # Next best: the latest headless batch report, if recent enough
+    report = get_batch_report()
+    if report is not None:
+        manifest, df = report
+        coverage = manifest.get('live_coverage')
+        st.caption(
+            f"Data from batch report {manifest['run_id']} ({manifest['created_at'].replace('T', ' ')})"
+            + (f", {coverage:.0%} of counties live" if coverage is not None else "")
+        )
+        render_policy_content(df)
+        return
+
+    # A frame streamed earlier in this session is reused when switching back
+    memo = st.session_state.get('policy_frame')
+    if memo is not None and time.monotonic() - memo[0] < TAB_MEMO_TTL:
+        render_policy_content(memo[1])
+        return
+
+    # Sampled modes fetch a few points and interpolate, so there is nothing to stream
+    if REGIONAL_SAMPLING_MODE != 'county':
+        with st.spinner("Loading sampled county weather..."):
+            df = weather_service.get_regional_data(COUNTY_REGISTRY)
+        render_interpolation_caption(df)
+        render_policy_content(df)
+        st.session_state.policy_frame = (time.monotonic(), df)
+        return
+
+    # Otherwise stream counties in and redraw as they arrive
+    total = COUNTY_REGISTRY.county_count()
+    progress = st.progress(0.0, text=f"Loading county weather (0/{total})...")
+    content = st.empty()
+    arrived = []
+    last_draw = 0.0
+    for index, location, weather in weather_service.iter_regional_data(COUNTY_REGISTRY):
+        arrived.append((index, location, weather))
+        done = len(arrived)
+        if done < total and time.monotonic() - last_draw < POLICY_STREAM_REFRESH_SECONDS:
+            continue
+
+        arrived.sort(key=lambda item: item[0])
+        df = weather_service.build_regional_frame(
+            [location for _, location, _ in arrived], [weather for _, _, weather in arrived]
+        )
+        with content.container():
+            render_policy_content(df, key=f"stream_{done}")
+        progress.progress(done / total, text=f"Loading county weather ({done}/{total})...")
+        last_draw = time.monotonic()
+    progress.empty()
+    st.session_state.policy_frame = (time.monotonic(), df)
+
+def render_interpolation_caption(df):
+    """Note how a sampled regional frame was interpolated, with its error estimate"""
+    info = df.attrs.get('interpolation')
+    if info:
+        rmse = info['loo_rmse']
+        note = f"Interpolated from {info['samples']} {info['mode']} samples for {info['counties']} counties"
+        if not np.isnan(rmse['Temperature']):
+            note += f" (estimated error ±{rmse['Temperature']:.1f}°C, ±{rmse['Humidity']:.0f}% humidity)"
+        if info['mock_samples']:
+            note += (f"; {info['mock_samples']} samples unavailable and left out, "
+                     f"{info['mock_counties']} counties on mock data")
+        st.caption(note)
+
+def render_policy_content(df, key="policy"):
+    """Render policy metrics, charts and table for a (possibly partial) regional frame"""
     # Summary statistics
     col1, col2, col3, col4 = st.columns(4)
 
@@ -219,16 +445,16 @@ def render_policy_tab():
     st.markdown("### Risk Distribution by State")
     risk_counts = df.groupby(['State', 'Risk_Level']).size().reset_index(name='Count')
     fig_risk = ui.render_risk_distribution_chart(risk_counts)
-    st.plotly_chart(fig_risk, use_container_width=True)
+    st.plotly_chart(fig_risk, use_container_width=True, key=f"{key}_risk")
 
     # Regional map
     st.markdown("### Temperature Distribution Map")
     fig_map = map_service.create_regional_map(df)
-    st.plotly_chart(fig_map, use_container_width=True)
+    st.plotly_chart(fig_map, use_container_width=True, key=f"{key}_map")
 
     # Data table
     st.markdown("### Detailed County Data")
-    st.dataframe(df.round(2), use_container_width=True)
+    st.dataframe(df.round(2), use_container_width=True, key=f"{key}_table")
 
 def render_about_tab():
     """Render about tab"""
@@ -248,12 +474,12 @@ def render_about_tab():
     ### 📍 Coverage
     AgriWatch monitors **{total_counties}** counties across **{total_states}** states in South Sudan:
     """.format(
-        total_counties=sum(len(counties) for counties in SOUTH_SUDAN_COUNTIES.values()),
-        total_states=len(SOUTH_SUDAN_COUNTIES)
+        total_counties=COUNTY_REGISTRY.county_count(),
+        total_states=COUNTY_REGISTRY.n_states
     ))
 
-    for state, counties in SOUTH_SUDAN_COUNTIES.items():
-        st.markdown(f"**{state}**: {', '.join(counties.keys())}")
+    for state in COUNTY_REGISTRY.state_names:
+        st.markdown(f"**{state}**: {', '.join(COUNTY_REGISTRY.counties_in_state(state))}")
 
     st.markdown("""
     ### 🛠️ Technology Stack
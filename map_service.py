@@ -1,7 +1,33 @@
+import copy
+import threading
+from collections import namedtuple
 import folium
+from folium.plugins import FastMarkerCluster
 from streamlit_folium import st_folium
 import plotly.express as px
 from config import MAP_HEIGHT, MAP_WIDTH, DEFAULT_ZOOM, COUNTY_ZOOM, SOUTH_SUDAN_CENTER
+from config import MAP_NEIGHBOUR_RADIUS_KM, MAP_MAX_NEIGHBOURS
+from county_registry import COUNTY_REGISTRY
+from spatial_index import COUNTY_INDEX
+
+# A base map plus the per-selection layers streamed onto it
+LocationMap = namedtuple('LocationMap', ['base', 'layers', 'center', 'zoom'])
+
+# Client-side marker factory for the nationwide cluster; row = [lat, lon, county, state]
+_CLUSTER_CALLBACK = """
+function (row) {
+    var marker = L.circleMarker(new L.LatLng(row[0], row[1]), {
+        radius: 4, color: 'darkblue', weight: 2, fillColor: 'lightblue', fillOpacity: 0.7
+    });
+    marker.bindTooltip(row[2] + ', ' + row[3]);
+    return marker;
+};
+"""
+
+# Shared by every session: MapService is recreated on each script run
+_base_maps = {}  # show_all_counties -> base map template, copied for each use
+_cluster_data = None
+_base_map_lock = threading.Lock()
 
 class MapService:
     def __init__(self):
@@ -10,59 +36,66 @@ class MapService:
         self.default_zoom = DEFAULT_ZOOM
         self.county_zoom = COUNTY_ZOOM
 
-    def create_location_map(self, coords, county_name, state_name, all_counties, risk_color):
-        """Create map centered on selected location with enhanced features"""
-        # Create map centered on the county with higher zoom
-        m = folium.Map(
-            location=[coords['lat'], coords['lon']],
-            zoom_start=self.county_zoom,
-            tiles='OpenStreetMap'
-        )
+    def find_neighbours(self, coords, county_name, radius_km=MAP_NEIGHBOUR_RADIUS_KM, limit=MAP_MAX_NEIGHBOURS):
+        """Nearest counties around a location, across state borders
+
+        Returns (county, state, coords, distance_km) tuples, nearest first.
+        """
+        ids, distances = COUNTY_INDEX.within_radius(coords['lat'], coords['lon'], radius_km)
+        neighbours = []
+        for county_id, distance in zip(ids, distances):
+            other_county = COUNTY_REGISTRY.county_names[county_id]
+            if other_county == county_name:
+                continue
+            neighbours.append((
+                other_county, COUNTY_REGISTRY.state_of(county_id),
+                COUNTY_REGISTRY.coords(county_id), float(distance)
+            ))
+            if len(neighbours) >= limit:
+                break
+        return neighbours
+
+    def county_at(self, lat, lon):
+        """(county, state, distance_km) of the county nearest to a clicked point"""
+        county_id, distance = COUNTY_INDEX.nearest(lat, lon)
+        return COUNTY_REGISTRY.county_names[county_id], COUNTY_REGISTRY.state_of(county_id), distance
+
+    def create_location_map(self, coords, county_name, state_name, risk_color, show_all_counties=False):
+        """Create map centered on selected location with enhanced features
+
+        The base map is identical for every selection, so the browser keeps it
+        and only re-centres it; the selected county's layer is sent on top.
+        With ``show_all_counties`` every county is drawn through a client-side
+        marker cluster instead of the nearest neighbours.
+        """
+        base = self._create_base_map(show_all_counties)
+        layer = self._selection_layer(coords, county_name, state_name, risk_color)
+        feature_group = folium.FeatureGroup(name='selection')
+
+        if not show_all_counties:
+            # Nearest counties, including those in neighbouring states, as one GeoJSON layer
+            folium.GeoJson(
+                layer['neighbours'],
+                marker=folium.CircleMarker(
+                    radius=4, color='darkblue', fill=True, fill_color='lightblue', fill_opacity=0.7, weight=2
+                ),
+                tooltip=folium.GeoJsonTooltip(fields=['label'], labels=False),
+                popup=folium.GeoJsonPopup(
+                    fields=['county', 'state', 'distance_km'], aliases=['County', 'State', 'Distance (km)']
+                )
+            ).add_to(feature_group)
 
         # Add prominent marker for selected county
         folium.Marker(
             [coords['lat'], coords['lon']],
-            popup=f"""
-            <div style='width: 200px;'>
-                <h4 style='color: #333; margin: 0;'>{county_name}</h4>
-                <hr style='margin: 5px 0;'>
-                <p style='margin: 2px 0;'><b>State:</b> {state_name}</p>
-                <p style='margin: 2px 0;'><b>Coordinates:</b></p>
-                <p style='margin: 2px 0; font-size: 12px;'>
-                    Lat: {coords['lat']:.4f}<br>
-                    Lon: {coords['lon']:.4f}
-                </p>
-            </div>
-            """,
+            popup=layer['popup'],
             tooltip=f"🏠 {county_name}, {state_name}",
             icon=folium.Icon(
                 color=risk_color, 
                 icon='map-marker',
                 prefix='fa'
             )
-        ).add_to(m)
-
-        # Add smaller markers for other counties in the state
-        for other_county, other_coords in all_counties.items():
-            if other_county != county_name:
-                folium.CircleMarker(
-                    [other_coords['lat'], other_coords['lon']],
-                    radius=4,
-                    popup=f"""
-                    <div style='width: 150px;'>
-                        <h5 style='margin: 0;'>{other_county}</h5>
-                        <p style='margin: 2px 0; font-size: 11px;'>
-                            {other_coords['lat']:.3f}, {other_coords['lon']:.3f}
-                        </p>
-                    </div>
-                    """,
-                    tooltip=f"{other_county}",
-                    color='darkblue',
-                    fill=True,
-                    fillColor='lightblue',
-                    fillOpacity=0.7,
-                    weight=2
-                ).add_to(m)
+        ).add_to(feature_group)
 
         # Add a circle around the selected county for emphasis
         folium.Circle(
@@ -73,9 +106,69 @@ class MapService:
             weight=2,
             fill=False,
             opacity=0.8
-        ).add_to(m)
+        ).add_to(feature_group)
+
+        zoom = self.default_zoom if show_all_counties else self.county_zoom
+        return LocationMap(base, [feature_group], (coords['lat'], coords['lon']), zoom)
+
+    def _create_base_map(self, show_all_counties):
+        """Selection-independent base map, with the nationwide cluster when requested
 
-        return m
+        Each variant is built once; st_folium adds the selection layers to
+        the map it renders, so every call gets its own copy of the template.
+        """
+        with _base_map_lock:
+            template = _base_maps.get(show_all_counties)
+            if template is None:
+                template = folium.Map(
+                    location=[SOUTH_SUDAN_CENTER['lat'], SOUTH_SUDAN_CENTER['lon']],
+                    zoom_start=self.default_zoom,
+                    tiles='OpenStreetMap'
+                )
+                if show_all_counties:
+                    FastMarkerCluster(self._county_cluster_data(), callback=_CLUSTER_CALLBACK).add_to(template)
+                _base_maps[show_all_counties] = template
+        return copy.deepcopy(template)
+
+    def _county_cluster_data(self):
+        """[lat, lon, county, state] rows for every county, built once per process"""
+        global _cluster_data
+        if _cluster_data is None:
+            _cluster_data = [
+                [float(COUNTY_REGISTRY.lat[i]), float(COUNTY_REGISTRY.lon[i]),
+                 COUNTY_REGISTRY.county_names[i], COUNTY_REGISTRY.state_of(i)]
+                for i in range(COUNTY_REGISTRY.n_counties)
+            ]
+        return _cluster_data
+
+    def _selection_layer(self, coords, county_name, state_name, risk_color):
+        """Neighbour GeoJSON and popup HTML for a selection"""
+        neighbours = {
+            'type': 'FeatureCollection',
+            'features': [{
+                'type': 'Feature',
+                'geometry': {'type': 'Point', 'coordinates': [other_coords['lon'], other_coords['lat']]},
+                'properties': {
+                    'county': other_county,
+                    'state': other_state,
+                    'distance_km': round(distance),
+                    'label': f"{other_county} ({distance:.0f} km)"
+                }
+            } for other_county, other_state, other_coords, distance in self.find_neighbours(coords, county_name)]
+        }
+        popup = f"""
+            <div style='width: 200px;'>
+                <h4 style='color: #333; margin: 0;'>{county_name}</h4>
+                <hr style='margin: 5px 0;'>
+                <p style='margin: 2px 0;'><b>State:</b> {state_name}</p>
+                <p style='margin: 2px 0;'><b>Coordinates:</b></p>
+                <p style='margin: 2px 0; font-size: 12px;'>
+                    Lat: {coords['lat']:.4f}<br>
+                    Lon: {coords['lon']:.4f}
+                </p>
+            </div>
+            """
+        return {'neighbours': neighbours, 'popup': popup}
 
     def create_regional_map(self, df):
         """Create regional temperature distribution map"""
@@ -95,10 +188,28 @@ class MapService:
         fig_map.update_layout(height=600)
         return fig_map
 
-    def render_map(self, map_obj, height=None, width=None):
-        """Render folium map with streamlit"""
+    def render_map(self, map_obj, height=None, width=None, key=None):
+        """Render folium map with streamlit
+
+        Only clicks are returned to the app, so panning and zooming the map do
+        not trigger a rerun. A LocationMap's layers, centre and zoom are
+        applied to the mounted map without reloading it.
+        """
+        if isinstance(map_obj, LocationMap):
+            return st_folium(
+                map_obj.base,
+                width=width or self.default_width,
+                height=height or self.default_height,
+                key=key,
+                center=map_obj.center,
+                zoom=map_obj.zoom,
+                feature_group_to_add=map_obj.layers,
+                returned_objects=["last_clicked", "last_object_clicked"]
+            )
         return st_folium(
             map_obj, 
             width=width or self.default_width, 
-            height=height or self.default_height
+            height=height or self.default_height,
+            key=key,
+            returned_objects=["last_clicked", "last_object_clicked"]
         )
\ No newline at end of file
@@ -0,0 +1,216 @@
+import os
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+import numpy as np
+from config import CACHE_DIR, RASTER_BOUNDS, RASTER_RESOLUTION, RASTER_WINDOW_CACHE_SIZE, RASTER_RETENTION_DAYS
+
+
+class RasterTileStore:
+    """On-disk store of national float32 raster pyramids, keyed by (indicator, date)
+
+    The base grid (level 0) is built once by a caller-supplied
+    ``builder(lons, lats, date)``. Level ``k`` averages 2^k x 2^k base cells
+    and is derived from level ``k - 1`` on first use. Every level is one
+    ``.npy`` file, memory-mapped read-only, so a window is a zero-copy slice.
+    Reads pick the coarsest level that still gives the requested number of
+    output cells, which keeps the cells read per view bounded. Recently used
+    windows are kept in an LRU.
+    """
+
+    def __init__(self, root=os.path.join(CACHE_DIR, 'rasters'), bounds=RASTER_BOUNDS,
+                 resolution=RASTER_RESOLUTION, window_cache_size=RASTER_WINDOW_CACHE_SIZE):
+        self.root = root
+        self.bounds = bounds
+        self.resolution = resolution
+        self.window_cache_size = window_cache_size
+
+        n_rows = int(round((bounds['lat_max'] - bounds['lat_min']) / resolution))
+        n_cols = int(round((bounds['lon_max'] - bounds['lon_min']) / resolution))
+        # Cell-centre coordinates
+        self.lats = bounds['lat_min'] + (np.arange(n_rows) + 0.5) * resolution
+        self.lons = bounds['lon_min'] + (np.arange(n_cols) + 0.5) * resolution
+        self.shape = (n_rows, n_cols)
+
+        # Pyramid axes per level, down to a single cell along the longer axis
+        self._axes = [(self.lons, self.lats)]
+        while max(len(a) for a in self._axes[-1]) > 1:
+            lons, lats = self._axes[-1]
+            self._axes.append((axis_block_mean(lons, 2), axis_block_mean(lats, 2)))
+        self.max_level = len(self._axes) - 1
+
+        self._grids = {}  # (indicator, date, level) -> memmap
+        self._windows = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'grid_builds': 0, 'level_builds': 0, 'grid_loads': 0, 'window_hits': 0, 'window_misses': 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _path(self, indicator, date, level=0):
+        slug = re.sub(r'[^a-z0-9]+', '_', indicator.lower()).strip('_')
+        suffix = f"_L{level}" if level else ""
+        return os.path.join(self.root, slug, f"{date}{suffix}.npy")
+
+    def grid(self, indicator, date, builder):
+        """The national base grid for (indicator, date) as a read-only memmap"""
+        return self.level(indicator, date, 0, builder)
+
+    def level(self, indicator, date, level, builder):
+        """Pyramid level ``level`` for (indicator, date), derived from the finer level if needed"""
+        key = (indicator, str(date), level)
+        with self._lock:
+            grid = self._grids.get(key)
+        if grid is not None:
+            return grid
+
+        path = self._path(indicator, key[1], level)
+        if not os.path.exists(path):
+            if level == 0:
+                data = np.asarray(builder(self.lons, self.lats, date), dtype=np.float32)
+                if data.shape != self.shape:
+                    raise ValueError(f"Raster builder returned {data.shape}, expected {self.shape}")
+                stat = 'grid_builds'
+            else:
+                data = block_mean(self.level(indicator, date, level - 1, builder), 2, 2)
+                stat = 'level_builds'
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp_path, data)
+            os.replace(tmp_path, path)
+            self._prune(os.path.dirname(path))
+            with self._lock:
+                self._stats[stat] += 1
+
+        grid = np.load(path, mmap_mode='r')
+        with self._lock:
+            self._stats['grid_loads'] += 1
+            grid = self._grids.setdefault(key, grid)
+            # Only the current date's levels are worth keeping mapped
+            for stale_key in [k for k in self._grids if k[0] == indicator and k[1] != key[1]]:
+                del self._grids[stale_key]
+        return grid
+
+    def choose_level(self, lat_span, lon_span, out_cells):
+        """Coarsest level that still has at least ``out_cells`` cells across the larger span"""
+        span = max(lat_span, lon_span)
+        level = 0
+        while level < self.max_level and span / (self.resolution * 2 ** (level + 1)) >= out_cells:
+            level += 1
+        return level
+
+    def read(self, indicator, date, lat_min, lat_max, lon_min, lon_max, out_cells, builder):
+        """(lons, lats, values, level) for a bounding box at about ``out_cells`` per axis"""
+        level = self.choose_level(lat_max - lat_min, lon_max - lon_min, out_cells)
+        lons, lats = self._axes[level]
+        row0, row1 = self._index_range(lats, lat_min, lat_max)
+        col0, col1 = self._index_range(lons, lon_min, lon_max)
+        key = (indicator, str(date), level, row0, row1, col0, col1)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None:
+                self._windows.move_to_end(key)
+                self._stats['window_hits'] += 1
+                return window
+            self._stats['window_misses'] += 1
+
+        grid = self.level(indicator, date, level, builder)
+        window = (lons[col0:col1], lats[row0:row1], grid[row0:row1, col0:col1], level)
+        with self._lock:
+            self._windows[key] = window
+            while len(self._windows) > self.window_cache_size:
+                self._windows.popitem(last=False)
+        return window
+
+    def window(self, indicator, date, lat, lon, extent, builder, out_cells=None):
+        """(lons, lats, values) views covering ``extent`` degrees around a point
+
+        Without ``out_cells`` the base resolution is used.
+        """
+        out_cells = out_cells or int(np.ceil(2 * extent / self.resolution))
+        lons, lats, values, _ = self.read(
+            indicator, date, lat - extent, lat + extent, lon - extent, lon + extent, out_cells, builder
+        )
+        return lons, lats, values
+
+    def national(self, indicator, date, builder, max_cells):
+        """The whole country at the pyramid level closest to ``max_cells`` per axis"""
+        b = self.bounds
+        lons, lats, values, _ = self.read(
+            indicator, date, b['lat_min'], b['lat_max'], b['lon_min'], b['lon_max'], max_cells, builder
+        )
+        return lons, lats, values
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['windows_cached'] = len(self._windows)
+            stats['grids_mapped'] = len(self._grids)
+        return stats
+
+    def _index_range(self, axis, low, high):
+        start = int(np.searchsorted(axis, low, side='left'))
+        stop = int(np.searchsorted(axis, high, side='right'))
+        start = min(max(start, 0), len(axis) - 1)
+        return start, max(stop, start + 1)
+
+    def _prune(self, directory):
+        # Drop daily grids older than the retention window
+        cutoff = (datetime.now() - timedelta(days=RASTER_RETENTION_DAYS)).strftime('%Y-%m-%d')
+        for name in os.listdir(directory):
+            if name.endswith('.npy') and name[:10] < cutoff:
+                try:
+                    os.remove(os.path.join(directory, name))
+                except OSError:
+                    pass
+
+
+_raster_store = None
+_raster_store_lock = threading.Lock()
+
+
+def get_raster_store():
+    """Return the process-wide raster tile store"""
+    global _raster_store
+    if _raster_store is None:
+        with _raster_store_lock:
+            if _raster_store is None:
+                _raster_store = RasterTileStore()
+    return _raster_store
+
+
+def block_mean(values, factor_y, factor_x):
+    """Downsample a 2-D array by averaging ``factor_y`` x ``factor_x`` blocks
+
+    Edge blocks that are only partly filled average the cells they contain.
+    """
+    values = np.asarray(values, dtype=np.float32)
+    rows, cols = values.shape
+    out_rows, out_cols = -(-rows // factor_y), -(-cols // factor_x)
+    if out_rows * factor_y != rows or out_cols * factor_x != cols:
+        padded = np.full((out_rows * factor_y, out_cols * factor_x), np.nan, dtype=np.float32)
+        padded[:rows, :cols] = values
+        values = padded
+    blocks = values.reshape(out_rows, factor_y, out_cols, factor_x)
+    if np.isnan(blocks).any():
+        return np.nanmean(blocks, axis=(1, 3))
+    return blocks.mean(axis=(1, 3))
+
+
+def axis_block_mean(axis, factor):
+    """Downsample a 1-D coordinate axis to match block_mean"""
+    axis = np.asarray(axis, dtype=np.float64)
+    out = -(-len(axis) // factor)
+    sums = np.add.reduceat(axis, np.arange(0, out * factor, factor)[:out])
+    counts = np.minimum(factor, len(axis) - np.arange(out) * factor)
+    return sums / counts
+
+
+def downsample_to_budget(x, y, values, max_cells):
+    """Block-average a regular grid until it fits in ``max_cells``
+
+    Returns (x, y, values, factor); factor is 1 when no downsampling was needed.
+    """
+    if values.size <= max_cells:
+        return x, y, values, 1
+    factor = int(np.ceil(np.sqrt(values.size / max_cells)))
+    return axis_block_mean(x, factor), axis_block_mean(y, factor), block_mean(values, factor, factor), factor
@@ -0,0 +1,323 @@
+import asyncio
+import threading
+import time
+
+
+class RateLimitTimeout(Exception):
+    """Raised when a caller waited longer than allowed for a rate limit token"""
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight call
+
+    The first caller for a key runs the function; callers arriving while it is
+    still running wait for and share its result (or its exception).
+    """
+
+    class _Call:
+        def __init__(self):
+            self.done = threading.Event()
+            self.result = None
+            self.error = None
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    def do(self, key, fn):
+        with self._lock:
+            self._stats['calls'] += 1
+            call = self._calls.get(key)
+            if call is not None:
+                self._stats['coalesced'] += 1
+                leader = False
+            else:
+                call = self._calls[key] = self._Call()
+                leader = True
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = len(self._calls)
+        return stats
+
+
+class AsyncSingleFlight:
+    """SingleFlight for coroutines on one event loop"""
+
+    def __init__(self):
+        self._calls = {}
+        self._stats = {'calls': 0, 'coalesced': 0}
+
+    async def do(self, key, fn):
+        """Await ``fn()`` once for all concurrent callers with the same key"""
+        self._stats['calls'] += 1
+        call = self._calls.get(key)
+        if call is not None:
+            self._stats['coalesced'] += 1
+            return await asyncio.shield(call)
+
+        call = self._calls[key] = asyncio.ensure_future(fn())
+        try:
+            return await asyncio.shield(call)
+        finally:
+            if call.done():
+                del self._calls[key]
+            else:
+                # The leader was cancelled; drop the entry when the shared call finishes
+                call.add_done_callback(lambda done: (self._calls.pop(key, None), done.cancelled() or done.exception()))
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats['in_flight'] = len(self._calls)
+        return stats
+
+
+def _wake(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class TokenBucket:
+    """Thread-safe token bucket that serves waiting callers in arrival order
+
+    Tokens refill continuously at ``rate_per_minute``; at most ``capacity``
+    tokens accumulate, which bounds the burst size. Threads (acquire) and
+    coroutines (acquire_async) queue on the same tickets.
+    """
+
+    # Seconds between ``check`` calls for the caller at the head of the queue
+    CHECK_INTERVAL = 0.1
+
+    def __init__(self, rate_per_minute, capacity=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(capacity or rate_per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._abandoned = set()
+        self._async_waiters = []  # (loop, future) pairs woken by _notify
+        self._stats = {'granted': 0, 'waited': 0, 'timeouts': 0, 'total_wait': 0.0}
+
+    def acquire(self, timeout=None, check=None):
+        """Block until a token is available and it is this caller's turn
+
+        Raises RateLimitTimeout if ``timeout`` seconds pass first. ``check``
+        is called while waiting; an exception it raises (e.g. from an open
+        circuit breaker) gives up the caller's turn and propagates.
+        """
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._take_ticket()
+            try:
+                while True:
+                    granted, wait = self._try_grant(ticket, start, timeout, check)
+                    if granted:
+                        return wait
+                    self._cond.wait(wait)
+            except BaseException:
+                self._give_up(ticket)
+                raise
+
+    async def acquire_async(self, timeout=None, check=None):
+        """Event-loop counterpart of acquire(), in the same arrival-order queue"""
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        with self._cond:
+            ticket = self._take_ticket()
+        try:
+            while True:
+                with self._cond:
+                    granted, wait = self._try_grant(ticket, start, timeout, check)
+                    if granted:
+                        return wait
+                    woken = loop.create_future()
+                    self._async_waiters.append((loop, woken))
+                try:
+                    await asyncio.wait_for(woken, wait)
+                except asyncio.TimeoutError:
+                    pass
+        except BaseException:
+            with self._cond:
+                self._give_up(ticket)
+            raise
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+            stats['queued'] = self._next_ticket - self._serving - len(self._abandoned)
+            stats['tokens'] = round(self._tokens, 2)
+        return stats
+
+    def _take_ticket(self):
+        ticket = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _try_grant(self, ticket, start, timeout, check):
+        """(True, waited) when ``ticket`` gets a token, else (False, seconds to wait or None)
+
+        Called with the lock held. Raises RateLimitTimeout past the timeout.
+        """
+        if check is not None:
+            check()
+        self._refill()
+        if ticket == self._serving:
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self._advance()
+                waited = time.monotonic() - start
+                self._stats['granted'] += 1
+                if waited > 0.001:
+                    self._stats['waited'] += 1
+                    self._stats['total_wait'] += waited
+                self._notify()
+                return True, waited
+            wait = (1 - self._tokens) / self.rate
+            if check is not None:
+                wait = min(wait, self.CHECK_INTERVAL)
+        else:
+            wait = None
+
+        if timeout is not None:
+            remaining = start + timeout - time.monotonic()
+            if remaining <= 0:
+                self._stats['timeouts'] += 1
+                raise RateLimitTimeout(f"Rate limit wait exceeded {timeout}s")
+            wait = remaining if wait is None else min(wait, remaining)
+        return False, wait
+
+    def _give_up(self, ticket):
+        # Called with the lock held when a waiter times out, fails its check or is cancelled
+        if ticket == self._serving:
+            self._advance()
+        elif ticket > self._serving:
+            self._abandoned.add(ticket)
+        self._notify()
+
+    def _notify(self):
+        self._cond.notify_all()
+        for loop, woken in self._async_waiters:
+            try:
+                loop.call_soon_threadsafe(_wake, woken)
+            except RuntimeError:  # The waiter's loop has closed
+                pass
+        self._async_waiters.clear()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _advance(self):
+        # Move to the next ticket still waiting, skipping callers that gave up
+        self._serving += 1
+        while self._serving in self._abandoned:
+            self._abandoned.discard(self._serving)
+            self._serving += 1
+
+
+class CircuitOpenError(Exception):
+    """Raised when a circuit breaker refuses a call"""
+
+
+class CircuitBreaker:
+    """Per-endpoint circuit breaker
+
+    After ``failure_threshold`` consecutive failures the breaker opens and
+    callers fail fast. Once ``recovery_timeout`` seconds have passed it
+    half-opens and grants a single probe call; the probe's outcome closes or
+    re-opens the breaker. A probe that never reports back is abandoned after
+    another ``recovery_timeout`` so the breaker cannot get stuck half-open.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    # Permits returned by before_call()
+    ALLOW = 'allow'
+    PROBE = 'probe'
+
+    def __init__(self, name, failure_threshold, recovery_timeout):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started = 0.0
+        self._lock = threading.Lock()
+        self._stats = {'rejected': 0, 'opened': 0}
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    def before_call(self):
+        """Return ALLOW or PROBE, or raise CircuitOpenError to fail fast"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return self.ALLOW
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.recovery_timeout:
+                self._state = self.HALF_OPEN
+            if self._state == self.HALF_OPEN:
+                now = time.monotonic()
+                if not self._probe_in_flight or now - self._probe_started >= self.recovery_timeout:
+                    self._probe_in_flight = True
+                    self._probe_started = now
+                    return self.PROBE
+            self._stats['rejected'] += 1
+            raise CircuitOpenError(f"Circuit '{self.name}' is {self._state}")
+
+    def check(self):
+        """Raise CircuitOpenError while the breaker is open, without taking a probe"""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at < self.recovery_timeout:
+                self._stats['rejected'] += 1
+                raise CircuitOpenError(f"Circuit '{self.name}' is {self._state}")
+
+    def record_success(self):
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self._stats['opened'] += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+            self._probe_in_flight = False
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['state'] = self._state
+            stats['consecutive_failures'] = self._failures
+        return stats
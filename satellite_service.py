@@ -1,14 +1,52 @@
-import requests
 import numpy as np
 import pandas as pd
 from datetime import datetime, timedelta
+import time
 import plotly.express as px
-from config import NASA_API_KEY
+import plotly.graph_objects as go
+from config import NASA_API_KEY, COUNTY_WINDOW_EXTENT, COUNTY_VIEW_CELLS, NATIONAL_VIEW_CELLS
+from config import NASA_IMAGERY_DIM, NASA_IMAGERY_LAG_DAYS, SATELLITE_PLOT_CELL_BUDGET
+from config import TIMESERIES_DEFAULT_DAYS, TIME_SERIES_MAX_POINTS
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT
+from http_client import get_http_client
+from county_registry import COUNTY_REGISTRY
+from imagery import get_imagery_cache, INDICATOR_DECODERS
+from resilience import CircuitBreaker
+from raster_store import get_raster_store, downsample_to_budget
+from synthetic_data import get_synthetic_provider
+from timeseries_store import get_timeseries_store, downsample_series
+
+# analysis type -> (colour scale, county title, colour label, national title)
+ANALYSIS_STYLES = {
+    "NDVI Analysis": ('RdYlGn', 'NDVI Analysis', 'NDVI Value', 'NDVI (Vegetation Health)'),
+    "Land Surface Temperature": ('RdYlBu_r', 'Land Surface Temperature', 'Temperature (°C)', 'Land Surface Temperature'),
+    "Soil Moisture": ('Blues', 'Soil Moisture', 'Moisture (%)', 'Soil Moisture Content'),
+    "Precipitation": ('viridis', 'Precipitation', 'Rainfall (mm)', 'Precipitation')
+}
+
+# analysis type -> time series y-axis label
+TIME_SERIES_LABELS = {
+    "NDVI Analysis": "NDVI Value",
+    "Land Surface Temperature": "Temperature (°C)",
+    "Soil Moisture": "Moisture (%)",
+    "Precipitation": "Precipitation (mm)"
+}
+
+# Shared by every SatelliteService instance, like the weather endpoints' breakers
+_nasa_breaker = CircuitBreaker('nasa_imagery', CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
 
 class SatelliteService:
-    def __init__(self):
+    def __init__(self, synthetic=None):
+        self.synthetic = synthetic or get_synthetic_provider()
+        self.raster_store = get_raster_store()
+        self.timeseries = get_timeseries_store()
         self.api_key = NASA_API_KEY
         self.nasa_base_url = "https://api.nasa.gov"
+        self.http = get_http_client()
+        self.imagery = get_imagery_cache()
+        self.breaker = _nasa_breaker
+        self.last_plot_stats = None
+        self.last_series_stats = None
 
     def get_county_satellite_data(self, lat, lon, analysis_type, county_name):
         """Get real satellite data for specific county coordinates"""
@@ -28,25 +66,51 @@ class SatelliteService:
     def _get_modis_ndvi_data(self, lat, lon, county_name):
         """Get MODIS NDVI data from NASA"""
         try:
-            # NASA MODIS/Terra Vegetation Indices endpoint
-            url = f"{self.nasa_base_url}/planetary/earth/imagery"
-            params = {
-                'lon': lon,
-                'lat': lat,
-                'date': (datetime.now() - timedelta(days=16)).strftime('%Y-%m-%d'),
-                'dim': 0.1,
-                'api_key': self.api_key
-            }
-
-            response = requests.get(url, params=params)
-            if response.status_code == 200:
-                # Process real imagery data here
-                return self._process_nasa_imagery(response, "NDVI", county_name)
+            date = (datetime.now() - timedelta(days=NASA_IMAGERY_LAG_DAYS)).strftime('%Y-%m-%d')
+            dim = NASA_IMAGERY_DIM
+            tile = self.imagery.get_or_fetch(
+                round(lat, 4), round(lon, 4), dim, date,
+                lambda: self._download_nasa_imagery(lat, lon, dim, date)
+            )
+            if tile is not None:
+                return self._process_nasa_imagery(tile, "NDVI Analysis", county_name, lat, lon, dim)
             else:
                 return self._generate_mock_county_data(lat, lon, "NDVI Analysis", county_name)
-        except:
+        except Exception as e:
+            print(f"NASA imagery error: {e}")
             return self._generate_mock_county_data(lat, lon, "NDVI Analysis", county_name)
 
+    def _download_nasa_imagery(self, lat, lon, dim, date):
+        """Encoded image bytes from the NASA earth imagery endpoint, or None
+
+        Raises CircuitOpenError while repeated upstream failures keep the breaker open.
+        """
+        self.breaker.before_call()
+        # NASA MODIS/Terra Vegetation Indices endpoint
+        url = f"{self.nasa_base_url}/planetary/earth/imagery"
+        params = {
+            'lon': lon,
+            'lat': lat,
+            'date': date,
+            'dim': dim,
+            'api_key': self.api_key
+        }
+
+        try:
+            response = self.http.get(url, params=params)
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure()
+            return None
+
+        # Any other answer, including "no imagery for this tile", means the upstream is up
+        self.breaker.record_success()
+        if response.status_code == 200 and response.headers.get('Content-Type', '').startswith('image/'):
+            return response.content
+        return None
+
     def _get_modis_lst_data(self, lat, lon, county_name):
         """Get Land Surface Temperature data"""
         return self._generate_mock_county_data(lat, lon, "Land Surface Temperature", county_name)
@@ -59,56 +123,97 @@ class SatelliteService:
         """Get precipitation data"""
         return self._generate_mock_county_data(lat, lon, "Precipitation", county_name)
 
-    def _process_nasa_imagery(self, response, data_type, county_name):
-        """Process NASA imagery response"""
-        # This would process real NASA imagery
-        # For now, return mock data focused on county
-        return self._generate_mock_county_data(0, 0, data_type, county_name)
+    def _process_nasa_imagery(self, tile, analysis_type, county_name, lat, lon, dim):
+        """Turn a decoded RGB tile into an indicator surface on lat/lon axes"""
+        Z = INDICATOR_DECODERS[analysis_type](tile)
+        height, width = Z.shape
+
+        # Image rows run north to south
+        x = np.linspace(lon - dim / 2, lon + dim / 2, width)
+        y = np.linspace(lat + dim / 2, lat - dim / 2, height)
+        X, Y = np.meshgrid(x, y, copy=False)
 
-    def _generate_mock_county_data(self, lat, lon, analysis_type, county_name):
-        """Generate realistic mock data centered on county coordinates"""
+        color_scale, name, color_label, _ = ANALYSIS_STYLES[analysis_type]
+        return (X, Y, Z), color_scale, f'{name} - {county_name}', color_label
+
+    def _generate_mock_county_data(self, lat, lon, analysis_type, county_name, date=None):
+        """Generate realistic mock data centered on county coordinates
+
+        The county grid is a zero-copy window of the national raster pyramid
+        for the day, so every county of the same day shares one computed surface.
+        """
         # Create data grid centered on county
-        extent = 0.3  # Degrees around the county
-        x = np.linspace(lon - extent, lon + extent, 30)
-        y = np.linspace(lat - extent, lat + extent, 30)
-        X, Y = np.meshgrid(x, y)
+        x, y, Z, _ = self.get_raster_view(
+            analysis_type,
+            lat - COUNTY_WINDOW_EXTENT, lat + COUNTY_WINDOW_EXTENT,
+            lon - COUNTY_WINDOW_EXTENT, lon + COUNTY_WINDOW_EXTENT,
+            COUNTY_VIEW_CELLS, date
+        )
+        X, Y = np.meshgrid(x, y, copy=False)
 
-        # Add realistic variations based on county location
-        seasonal_factor = np.sin(2 * np.pi * datetime.now().timetuple().tm_yday / 365)
+        color_scale, name, color_label, _ = ANALYSIS_STYLES.get(analysis_type, ANALYSIS_STYLES["Precipitation"])
+        title = f'{name} - {county_name}'
+        return (X, Y, Z), color_scale, title, color_label
+
+    def get_raster_view(self, analysis_type, lat_min, lat_max, lon_min, lon_max, out_cells, date=None):
+        """(lons, lats, values, level) for any extent, read from the matching pyramid level
+
+        The level is the coarsest one with at least ``out_cells`` cells across
+        the extent, so the cells read stay bounded at every zoom.
+        """
+        date = date or datetime.now().date()
+        return self.raster_store.read(
+            analysis_type, date, lat_min, lat_max, lon_min, lon_max, out_cells,
+            self._make_surface_builder(analysis_type)
+        )
+
+    def _make_surface_builder(self, analysis_type):
+        """Raster store builder for one indicator's national surface"""
+        return lambda lons, lats, date: self._build_national_surface(analysis_type, lons, lats, date)
+
+    def _build_national_surface(self, analysis_type, lons, lats, date):
+        """Compute a national indicator surface on the given cell-centre axes"""
+        X, Y = np.meshgrid(lons, lats)
+
+        # Add realistic variations based on location and season
+        seasonal_factor = np.sin(2 * np.pi * date.timetuple().tm_yday / 365)
+        noise = self.synthetic.raster_noise("South Sudan", analysis_type, X.shape, date)
 
         if analysis_type == "NDVI Analysis":
             # NDVI values for agricultural areas
             base_ndvi = 0.35 + 0.15 * seasonal_factor
-            Z = base_ndvi + 0.2 * np.exp(-((X-lon)**2 + (Y-lat)**2) / 0.01) + 0.1 * np.random.random(X.shape)
+            Z = base_ndvi + 0.2 * self._county_bumps(lons, lats, 0.01) + 0.1 * noise
             Z = np.clip(Z, -1, 1)
-            color_scale = 'RdYlGn'
-            title = f'NDVI Analysis - {county_name}'
-            color_label = 'NDVI Value'
 
         elif analysis_type == "Land Surface Temperature":
             base_temp = 32 + 5 * seasonal_factor
-            Z = base_temp + 3 * np.sin(X * 10) * np.cos(Y * 10) + 2 * np.random.random(X.shape)
-            color_scale = 'RdYlBu_r'
-            title = f'Land Surface Temperature - {county_name}'
-            color_label = 'Temperature (°C)'
+            Z = base_temp + 3 * np.sin(X * 10) * np.cos(Y * 10) + 2 * noise
 
         elif analysis_type == "Soil Moisture":
             base_moisture = 25 - 10 * seasonal_factor
-            Z = base_moisture + 15 * np.exp(-((X-lon)**2 + (Y-lat)**2) / 0.02) + 5 * np.random.random(X.shape)
+            Z = base_moisture + 15 * self._county_bumps(lons, lats, 0.02) + 5 * noise
             Z = np.clip(Z, 0, 100)
-            color_scale = 'Blues'
-            title = f'Soil Moisture - {county_name}'
-            color_label = 'Moisture (%)'
 
         else:  # Precipitation
             base_precip = 40 + 20 * seasonal_factor
-            Z = base_precip + 25 * np.cos(X * 5) * np.sin(Y * 5) + 10 * np.random.random(X.shape)
+            Z = base_precip + 25 * np.cos(X * 5) * np.sin(Y * 5) + 10 * noise
             Z = np.clip(Z, 0, None)
-            color_scale = 'viridis'
-            title = f'Precipitation - {county_name}'
-            color_label = 'Rainfall (mm)'
 
-        return (X, Y, Z), color_scale, title, color_label
+        return Z
+
+    def _county_bumps(self, lons, lats, width):
+        """Max of Gaussian bumps exp(-d^2 / width) centred on every county"""
+        bumps = np.zeros((len(lats), len(lons)))
+        reach = 4 * np.sqrt(width)  # exp(-16) beyond this is negligible
+        for lat, lon in zip(COUNTY_REGISTRY.lat, COUNTY_REGISTRY.lon):
+            r0, r1 = np.searchsorted(lats, [lat - reach, lat + reach])
+            c0, c1 = np.searchsorted(lons, [lon - reach, lon + reach])
+            if r0 >= r1 or c0 >= c1:
+                continue
+            dy = (lats[r0:r1] - lat)[:, None]
+            dx = (lons[c0:c1] - lon)[None, :]
+            np.maximum(bumps[r0:r1, c0:c1], np.exp(-(dx ** 2 + dy ** 2) / width), out=bumps[r0:r1, c0:c1])
+        return bumps
 
     def generate_satellite_data(self, analysis_type, county_coords=None, county_name="South Sudan"):
         """Generate satellite analysis data - updated to use county-specific data"""
@@ -117,107 +222,171 @@ class SatelliteService:
                 county_coords['lat'], county_coords['lon'], analysis_type, county_name
             )
 
-        # Fallback to regional data
-        x = np.linspace(28, 34, 50)
-        y = np.linspace(4, 10, 50)
-        X, Y = np.meshgrid(x, y)
-
-        if analysis_type == "NDVI Analysis":
-            Z = 0.4 + 0.3 * np.sin(X/2) * np.cos(Y/3) + 0.1 * np.random.random(X.shape)
-            color_scale = 'RdYlGn'
-            title = 'NDVI (Vegetation Health)'
-            color_label = 'NDVI Value'
-        elif analysis_type == "Land Surface Temperature":
-            Z = 35 + 8 * np.sin(X/3) + 3 * np.cos(Y/2) + 2 * np.random.random(X.shape)
-            color_scale = 'RdYlBu_r'
-            title = 'Land Surface Temperature'
-            color_label = 'Temperature (°C)'
-        elif analysis_type == "Soil Moisture":
-            Z = 30 + 20 * np.sin(X/4) * np.cos(Y/2) + 5 * np.random.random(X.shape)
-            color_scale = 'Blues'
-            title = 'Soil Moisture Content'
-            color_label = 'Moisture (%)'
-        else:  # Precipitation
-            Z = 50 + 30 * np.cos(X/2) * np.sin(Y/3) + 10 * np.random.random(X.shape)
-            color_scale = 'viridis'
-            title = 'Precipitation'
-            color_label = 'Rainfall (mm)'
+        # Fallback to regional data: today's national raster at the overview level
+        b = self.raster_store.bounds
+        x, y, Z, _ = self.get_raster_view(
+            analysis_type, b['lat_min'], b['lat_max'], b['lon_min'], b['lon_max'], NATIONAL_VIEW_CELLS
+        )
+        X, Y = np.meshgrid(x, y, copy=False)
 
+        color_scale, _, color_label, title = ANALYSIS_STYLES.get(analysis_type, ANALYSIS_STYLES["Precipitation"])
         return (X, Y, Z), color_scale, title, color_label
 
-    def generate_time_series(self, analysis_type, county_name="County"):
-        """Generate time series data for analysis"""
-        dates = pd.date_range(start=datetime.now() - timedelta(days=30), end=datetime.now(), freq='D')
+    def generate_time_series(self, analysis_type, county_name="County", start=None, end=None):
+        """Daily series for one county between ``start`` and ``end`` (inclusive)
+
+        Values come from the on-disk history, which is first extended up to
+        today. Defaults to the last ``TIMESERIES_DEFAULT_DAYS`` days.
+        """
+        today = datetime.now().date()
+        end = min(end or today, today)
+        start = start or end - timedelta(days=TIMESERIES_DEFAULT_DAYS)
+        ylabel = TIME_SERIES_LABELS.get(analysis_type, TIME_SERIES_LABELS["Precipitation"])
+
+        if county_name not in self.timeseries.county_index:
+            dates = pd.date_range(start=start, end=end, freq='D')
+            values, ylabel = self.generate_time_series_batch(analysis_type, [county_name], dates)
+            return pd.DataFrame({'Date': dates, 'Value': values[0]}), ylabel
+
+        self.extend_history(analysis_type, today)
+        dates, values = self.timeseries.query(analysis_type, start, end, [county_name])
+
+        df = pd.DataFrame({
+            'Date': pd.to_datetime(dates),
+            'Value': values[:, 0]
+        })
+
+        return df, ylabel
+
+    def county_summary(self, analysis_type, county_name, coords, days=TIMESERIES_DEFAULT_DAYS):
+        """Today's mean over the county window and the mean of the last ``days`` daily values"""
+        _, _, values, _ = self.get_raster_view(
+            analysis_type,
+            coords['lat'] - COUNTY_WINDOW_EXTENT, coords['lat'] + COUNTY_WINDOW_EXTENT,
+            coords['lon'] - COUNTY_WINDOW_EXTENT, coords['lon'] + COUNTY_WINDOW_EXTENT,
+            COUNTY_VIEW_CELLS
+        )
+        series, _ = self.generate_time_series(analysis_type, county_name)
+        recent = series['Value'].to_numpy()[-days:]
+        return {
+            'current': float(np.nanmean(values)),
+            'mean': float(np.nanmean(recent)) if len(recent) else float('nan')
+        }
+
+    def prepare_day(self, analysis_type, date):
+        """Build the day's national raster and extend the history up to it
+
+        Lets a parent process write the shared files once before workers read them.
+        """
+        self.raster_store.grid(analysis_type, date, self._make_surface_builder(analysis_type))
+        self.extend_history(analysis_type, date)
+
+    def extend_history(self, analysis_type, end):
+        """Append the missing days up to ``end`` to the indicator history for all counties"""
+        county_names = list(self.timeseries.county_names)
+        return self.timeseries.extend(
+            analysis_type, end,
+            lambda dates: self.generate_time_series_batch(analysis_type, county_names, dates)[0].T
+        )
+
+    def generate_time_series_batch(self, analysis_type, county_names, dates):
+        """Generate deterministic daily series for many counties at once
+
+        Returns an (n_counties, n_dates) array and the y-axis label. Each value
+        depends only on (county, indicator, date).
+        """
+        days = np.array([d.toordinal() for d in pd.DatetimeIndex(dates).date], dtype=float)
+        phase = days * 2 * np.pi / 30
 
         # Add county-specific variations
-        county_factor = hash(county_name) % 100 / 100.0  # Consistent variation per county
+        county_factor = self.synthetic.county_factor(county_names)[:, None]  # Consistent variation per county
+        noise = self.synthetic.daily_noise(county_names, analysis_type, dates)
 
         if analysis_type == "NDVI Analysis":
-            base_values = 0.4 + 0.1 * np.sin(np.arange(len(dates)) * 2 * np.pi / 30)
-            base_values += county_factor * 0.2  # County-specific baseline
-            values = base_values + 0.05 * np.random.normal(0, 1, len(dates))
+            base_values = 0.4 + 0.1 * np.sin(phase)
+            base_values = base_values + county_factor * 0.2  # County-specific baseline
+            values = base_values + 0.05 * noise
             values = np.clip(values, -1, 1)
-            ylabel = "NDVI Value"
         elif analysis_type == "Land Surface Temperature":
-            base_values = 32 + 3 * np.sin(np.arange(len(dates)) * 2 * np.pi / 30)
-            base_values += (county_factor - 0.5) * 8  # County elevation/location effect
-            values = base_values + 2 * np.random.normal(0, 1, len(dates))
-            ylabel = "Temperature (°C)"
+            base_values = 32 + 3 * np.sin(phase)
+            base_values = base_values + (county_factor - 0.5) * 8  # County elevation/location effect
+            values = base_values + 2 * noise
         elif analysis_type == "Soil Moisture":
-            base_values = 35 + 10 * np.cos(np.arange(len(dates)) * 2 * np.pi / 30)
-            base_values += county_factor * 20  # County-specific soil characteristics
-            values = base_values + 3 * np.random.normal(0, 1, len(dates))
+            base_values = 35 + 10 * np.cos(phase)
+            base_values = base_values + county_factor * 20  # County-specific soil characteristics
+            values = base_values + 3 * noise
             values = np.clip(values, 0, 100)
-            ylabel = "Moisture (%)"
         else:  # Precipitation
-            base_values = 40 + 15 * np.sin(np.arange(len(dates)) * 2 * np.pi / 30)
-            base_values += county_factor * 30  # County rainfall patterns
-            values = np.maximum(0, base_values + 20 * np.random.normal(0, 1, len(dates)))
-            ylabel = "Precipitation (mm)"
+            base_values = 40 + 15 * np.sin(phase)
+            base_values = base_values + county_factor * 30  # County rainfall patterns
+            values = np.maximum(0, base_values + 20 * noise)
 
-        df = pd.DataFrame({
-            'Date': dates,
-            'Value': values
-        })
+        return values, TIME_SERIES_LABELS.get(analysis_type, TIME_SERIES_LABELS["Precipitation"])
 
-        return df, ylabel
+    def create_time_series_plot(self, time_series_df, analysis_type, date_range=None, max_points=TIME_SERIES_MAX_POINTS):
+        """Create time series plot for satellite data, framed to ``date_range`` when given
+
+        Series longer than ``max_points`` are reduced with LTTB, keeping the
+        extremes; point counts are recorded in ``self.last_series_stats``.
+        """
+        source_points = len(time_series_df)
+        if source_points > max_points:
+            dates = time_series_df['Date'].to_numpy(dtype='datetime64[D]').astype(np.int64)
+            kept = downsample_series(dates, time_series_df['Value'].to_numpy(), max_points)
+            time_series_df = time_series_df.iloc[kept]
+        self.last_series_stats = {'source_points': source_points, 'rendered_points': len(time_series_df)}
 
-    def create_time_series_plot(self, time_series_df, analysis_type):
-        """Create time series plot for satellite data"""
+        if date_range:
+            start, end = date_range
+            title = f"{analysis_type} Trend ({start:%d %b %Y} – {end:%d %b %Y})"
+        else:
+            title = f"30-Day {analysis_type} Trend"
         fig_time = px.line(
             time_series_df, 
             x='Date', 
             y='Value',
-            title=f"30-Day {analysis_type} Trend"
+            title=title
         )
         fig_time.update_layout(height=400)
+        if date_range:
+            fig_time.update_xaxes(range=[pd.Timestamp(start), pd.Timestamp(end)])
         return fig_time
 
-    def create_satellite_plot(self, data, color_scale, title, color_label):
-        """Create plotly figure for satellite data"""
+    def create_satellite_plot(self, data, color_scale, title, color_label, max_cells=SATELLITE_PLOT_CELL_BUDGET):
+        """Create plotly figure for satellite data
+
+        The grid is sent as a native heatmap with 1-D axes. Grids larger than
+        ``max_cells`` are block-averaged first. Build time and the size of the
+        z values sent are recorded in ``self.last_plot_stats``.
+        """
+        started = time.perf_counter()
         X, Y, Z = data
-        
-        # Use contour plot for 3D data visualization
-        fig = px.density_heatmap(
-            x=X.flatten(),
-            y=Y.flatten(),
-            z=Z.flatten(),
-            title=title,
-            color_continuous_scale=color_scale,
-            labels={'z': color_label, 'x': 'Longitude', 'y': 'Latitude'}
-        )
-        
-        # Alternative: Use contour plot
-        # fig = px.contour(
-        #     x=X[0,:], y=Y[:,0], z=Z,
-        #     title=title,
-        #     color_continuous_scale=color_scale,
-        #     labels={'z': color_label, 'x': 'Longitude', 'y': 'Latitude'}
-        # )
-        
+        x, y = X[0, :], Y[:, 0]
+        source_shape = Z.shape
+        x, y, Z, factor = downsample_to_budget(x, y, Z, max_cells)
+
+        fig = go.Figure(go.Heatmap(
+            x=x,
+            y=y,
+            z=Z,
+            colorscale=color_scale,
+            colorbar=dict(title=color_label),
+            hovertemplate='Lon %{x:.3f}<br>Lat %{y:.3f}<br>' + color_label + ': %{z:.2f}<extra></extra>'
+        ))
+
         fig.update_layout(
+            title=title,
             height=400,
             xaxis_title="Longitude",
             yaxis_title="Latitude"
         )
-        return fig
\ No newline at end of file
+        build_ms = (time.perf_counter() - started) * 1000
+
+        self.last_plot_stats = {
+            'source_shape': source_shape,
+            'rendered_shape': Z.shape,
+            'downsample_factor': factor,
+            'build_ms': build_ms,
+            'data_bytes': Z.size * Z.dtype.itemsize
+        }
+        return fig
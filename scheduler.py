@@ -0,0 +1,100 @@
+import threading
+import time
+from collections import namedtuple
+from datetime import datetime
+from types import MappingProxyType
+from config import SNAPSHOT_REFRESH_INTERVAL, SNAPSHOT_COUNTY_STAGGER, REGIONAL_SAMPLING_MODE
+from county_registry import county_locations
+
+# Immutable nationwide snapshot. ``regional`` is the get_regional_data frame and
+# must be treated as read-only; ``weather`` maps county name -> weather data.
+WeatherSnapshot = namedtuple('WeatherSnapshot', ['created_at', 'duration', 'regional', 'weather'])
+
+
+class SnapshotScheduler:
+    """Background thread that keeps a nationwide weather snapshot warm
+
+    Every ``interval`` seconds all counties are refreshed one after another,
+    ``stagger`` seconds apart so the upstream quota is never exceeded. Readers
+    get the last published snapshot in constant time. With a ``sampling``
+    mode other than 'county' only the sample points are fetched and county
+    weather is interpolated from them, as in get_regional_data.
+    """
+
+    def __init__(self, weather_service, counties_data, interval=SNAPSHOT_REFRESH_INTERVAL,
+                 stagger=SNAPSHOT_COUNTY_STAGGER, sampling=REGIONAL_SAMPLING_MODE):
+        self.weather_service = weather_service
+        self.counties_data = counties_data
+        self.sampling = sampling
+        self.interval = interval
+        self.stagger = stagger
+        self._snapshot = None
+        self._published = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self.progress = (0, 0)  # (counties or sample points refreshed, total) for the refresh in progress
+
+    @property
+    def snapshot(self):
+        """The latest published WeatherSnapshot, or None before the first refresh"""
+        return self._snapshot
+
+    def start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="snapshot-scheduler", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def wait_for_snapshot(self, timeout=None):
+        """Block until the first snapshot is published; returns it or None"""
+        self._published.wait(timeout)
+        return self._snapshot
+
+    def refresh(self):
+        """Refresh every county (or sample point) once and publish a new snapshot"""
+        started = time.monotonic()
+        locations = county_locations(self.counties_data)
+        plan = self.weather_service.sampling_plan(locations, self.sampling)
+        targets = locations if plan is None else self.weather_service.sample_locations(locations, plan)
+        fetched = []
+        for i, (state, county, coords) in enumerate(targets):
+            if self._stop.is_set():
+                return None
+            if i and self.stagger:
+                self._stop.wait(self.stagger)
+
+            fetched.append(self.weather_service.get_county_weather(county, coords))
+            self.progress = (i + 1, len(targets))
+
+        if plan is None:
+            weathers = fetched
+            regional = self.weather_service.build_regional_frame(locations, weathers)
+        else:
+            weathers = self.weather_service.interpolate_weathers(plan, fetched)
+            regional = self.weather_service.build_regional_frame(locations, weathers)
+            regional.attrs['interpolation'] = self.weather_service.interpolation_summary(locations, plan, fetched)
+
+        snapshot = WeatherSnapshot(
+            created_at=datetime.now(),
+            duration=time.monotonic() - started,
+            regional=regional,
+            weather=MappingProxyType({county: w for (_, county, _), w in zip(locations, weathers)})
+        )
+        self._snapshot = snapshot
+        self._published.set()
+        return snapshot
+
+    def _run(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.refresh()
+            except Exception as e:
+                print(f"Snapshot refresh error: {e}")
+            self._stop.wait(max(0, self.interval - (time.monotonic() - started)))
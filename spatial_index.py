@@ -0,0 +1,108 @@
+import numpy as np
+from county_registry import COUNTY_REGISTRY
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = np.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat, lon, lats, lons):
+    """Great-circle distance in km from one point to arrays of points"""
+    lat1, lon1 = np.radians(lat), np.radians(lon)
+    lat2, lon2 = np.radians(lats), np.radians(lons)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class SpatialIndex:
+    """Uniform-grid spatial index over point coordinates
+
+    Points are bucketed into ``cell_size`` degree cells, so a query only
+    measures distances to points in the cells around it. Distances are
+    great-circle kilometres.
+    """
+
+    def __init__(self, lats, lons, cell_size=0.5):
+        self.lats = np.ascontiguousarray(lats, dtype=np.float64)
+        self.lons = np.ascontiguousarray(lons, dtype=np.float64)
+        self.cell_size = cell_size
+        self.lat0 = float(self.lats.min()) if len(self.lats) else 0.0
+        self.lon0 = float(self.lons.min()) if len(self.lons) else 0.0
+
+        rows, cols = self._cell(self.lats, self.lons)
+        self.n_rows = int(rows.max()) + 1 if len(rows) else 0
+        self.n_cols = int(cols.max()) + 1 if len(cols) else 0
+
+        # CSR layout: point ids sorted by cell, with a start offset per cell
+        cell_ids = rows * max(self.n_cols, 1) + cols
+        self._order = np.argsort(cell_ids, kind='stable')
+        counts = np.bincount(cell_ids, minlength=self.n_rows * self.n_cols)
+        self._starts = np.concatenate(([0], np.cumsum(counts)))
+
+    def _cell(self, lat, lon):
+        rows = np.floor((np.asarray(lat) - self.lat0) / self.cell_size).astype(np.int64)
+        cols = np.floor((np.asarray(lon) - self.lon0) / self.cell_size).astype(np.int64)
+        return rows, cols
+
+    def _candidates(self, row_lo, row_hi, col_lo, col_hi):
+        # Point ids in the (clipped) block of cells [row_lo, row_hi] x [col_lo, col_hi]
+        row_lo, row_hi = max(row_lo, 0), min(row_hi, self.n_rows - 1)
+        col_lo, col_hi = max(col_lo, 0), min(col_hi, self.n_cols - 1)
+        if row_lo > row_hi or col_lo > col_hi:
+            return np.empty(0, dtype=np.int64)
+        chunks = []
+        for row in range(row_lo, row_hi + 1):
+            base = row * self.n_cols
+            start, stop = self._starts[base + col_lo], self._starts[base + col_hi + 1]
+            if stop > start:
+                chunks.append(self._order[start:stop])
+        return np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int64)
+
+    def within_radius(self, lat, lon, radius_km):
+        """Ids and distances of all points within ``radius_km``, nearest first"""
+        dlat = radius_km / KM_PER_DEGREE
+        dlon = radius_km / (KM_PER_DEGREE * max(np.cos(np.radians(min(abs(lat) + dlat, 89.0))), 1e-6))
+        row_lo, col_lo = self._cell(lat - dlat, lon - dlon)
+        row_hi, col_hi = self._cell(lat + dlat, lon + dlon)
+        ids = self._candidates(int(row_lo), int(row_hi), int(col_lo), int(col_hi))
+        distances = haversine_km(lat, lon, self.lats[ids], self.lons[ids])
+        keep = distances <= radius_km
+        ids, distances = ids[keep], distances[keep]
+        order = np.argsort(distances, kind='stable')
+        return ids[order], distances[order]
+
+    def k_nearest(self, lat, lon, k):
+        """Ids and distances of the ``k`` nearest points, nearest first"""
+        k = min(k, len(self.lats))
+        if k <= 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        row, col = (int(v) for v in self._cell(lat, lon))
+        max_ring = max(self.n_rows, self.n_cols) + abs(row) + abs(col)
+        ring = 0
+        while True:
+            ids = self._candidates(row - ring, row + ring, col - ring, col + ring)
+            if len(ids) >= k:
+                distances = haversine_km(lat, lon, self.lats[ids], self.lons[ids])
+                order = np.argsort(distances, kind='stable')[:k]
+                # Everything outside the searched block is at least this far away
+                covered_deg = ring * self.cell_size
+                covered_km = covered_deg * KM_PER_DEGREE * np.cos(np.radians(min(abs(lat) + covered_deg, 89.0)))
+                if distances[order[-1]] <= covered_km or ring >= max_ring:
+                    return ids[order], distances[order]
+            elif ring >= max_ring:
+                return self.k_nearest_brute_force(lat, lon, k)
+            ring += 1
+
+    def nearest(self, lat, lon):
+        """Id and distance of the single nearest point"""
+        ids, distances = self.k_nearest(lat, lon, 1)
+        return int(ids[0]), float(distances[0])
+
+    def k_nearest_brute_force(self, lat, lon, k):
+        """Reference implementation that measures every point"""
+        distances = haversine_km(lat, lon, self.lats, self.lons)
+        order = np.argsort(distances, kind='stable')[:k]
+        return order, distances[order]
+
+
+COUNTY_INDEX = SpatialIndex(COUNTY_REGISTRY.lat, COUNTY_REGISTRY.lon)
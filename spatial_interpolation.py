@@ -0,0 +1,180 @@
+from collections import namedtuple
+import numpy as np
+from config import IDW_POWER, IDW_NEIGHBOURS
+from spatial_index import haversine_km
+
+# Points to fetch and, for every target, the sample indices and weights that interpolate it
+# (step_deg is the node spacing of grid plans)
+SamplingPlan = namedtuple(
+    'SamplingPlan', ['mode', 'sample_lats', 'sample_lons', 'indices', 'weights', 'step_deg'], defaults=(None,)
+)
+
+
+def pairwise_km(lats_a, lons_a, lats_b, lons_b):
+    """(len(a), len(b)) matrix of great-circle distances in km"""
+    return haversine_km(
+        np.asarray(lats_a, dtype=np.float64)[:, None], np.asarray(lons_a, dtype=np.float64)[:, None],
+        np.asarray(lats_b, dtype=np.float64)[None, :], np.asarray(lons_b, dtype=np.float64)[None, :]
+    )
+
+
+def idw_weights(sample_lats, sample_lons, lats, lons, k=IDW_NEIGHBOURS, power=IDW_POWER):
+    """Inverse-distance weights of the ``k`` nearest samples for every target point
+
+    Returns (indices, weights), both shaped (n_targets, k), with rows of
+    weights summing to 1. A target that coincides with a sample takes that
+    sample's value exactly.
+    """
+    distances = pairwise_km(lats, lons, sample_lats, sample_lons)
+    k = max(1, min(k, distances.shape[1]))
+    indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    nearest = np.take_along_axis(distances, indices, axis=1)
+
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / nearest ** power
+    exact = nearest == 0
+    has_exact = exact.any(axis=1)
+    weights[has_exact] = exact[has_exact]
+    return indices, weights / weights.sum(axis=1, keepdims=True)
+
+
+def quantized_cells(lats, lons, cell_deg):
+    """Group points by ``cell_deg`` degree cell; returns (cell id per point, member-centroid lats, lons)"""
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    keys = np.stack([np.floor(lats / cell_deg), np.floor(lons / cell_deg)], axis=1)
+    _, cell_ids = np.unique(keys, axis=0, return_inverse=True)
+    cell_ids = cell_ids.ravel()
+    counts = np.bincount(cell_ids)
+    return cell_ids, np.bincount(cell_ids, lats) / counts, np.bincount(cell_ids, lons) / counts
+
+
+def cell_plan(lats, lons, cell_deg, k=IDW_NEIGHBOURS, power=IDW_POWER):
+    """One sample per occupied cell (at its counties' centroid), interpolated by IDW"""
+    _, sample_lats, sample_lons = quantized_cells(lats, lons, cell_deg)
+    indices, weights = idw_weights(sample_lats, sample_lons, lats, lons, k, power)
+    return SamplingPlan('cell', sample_lats, sample_lons, indices, weights)
+
+
+def grid_plan(lats, lons, step_deg):
+    """Regular ``step_deg`` grid nodes around the points, interpolated bilinearly
+
+    Only the corners of cells that contain a point (and carry weight) are
+    sampled, so empty parts of the country cost no calls.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lons = np.asarray(lons, dtype=np.float64)
+    lat0 = np.floor(lats.min() / step_deg) * step_deg
+    lon0 = np.floor(lons.min() / step_deg) * step_deg
+    y = (lats - lat0) / step_deg
+    x = (lons - lon0) / step_deg
+    row, col = np.floor(y).astype(np.int64), np.floor(x).astype(np.int64)
+    fy, fx = y - row, x - col
+
+    # Corner order: (row, col), (row, col+1), (row+1, col), (row+1, col+1)
+    corner_rows = np.stack([row, row, row + 1, row + 1], axis=1)
+    corner_cols = np.stack([col, col + 1, col, col + 1], axis=1)
+    weights = np.stack([(1 - fy) * (1 - fx), (1 - fy) * fx, fy * (1 - fx), fy * fx], axis=1)
+
+    # Zero-weight corners (points on a grid line) are pointed at a used corner
+    used = weights > 0
+    first_used = np.argmax(used, axis=1)
+    corner_rows = np.where(used, corner_rows, corner_rows[np.arange(len(row)), first_used][:, None])
+    corner_cols = np.where(used, corner_cols, corner_cols[np.arange(len(col)), first_used][:, None])
+
+    n_cols = int(corner_cols.max()) + 1
+    nodes, indices = np.unique(corner_rows * n_cols + corner_cols, return_inverse=True)
+    indices = indices.reshape(weights.shape)
+    sample_lats = lat0 + (nodes // n_cols) * step_deg
+    sample_lons = lon0 + (nodes % n_cols) * step_deg
+    return SamplingPlan('grid', sample_lats, sample_lons, indices, weights, step_deg)
+
+
+def interpolate(values, indices, weights):
+    """Weighted combination of sample values for every target
+
+    ``values`` is (n_samples, ...); the result is (n_targets, ...).
+    """
+    values = np.asarray(values, dtype=np.float64)
+    gathered = values[indices]
+    weights = weights.reshape(weights.shape + (1,) * (values.ndim - 1))
+    return (gathered * weights).sum(axis=1)
+
+
+def exclude_samples(plan, excluded):
+    """The plan with the ``excluded`` samples' weight spread over each target's other samples
+
+    Returns (plan, orphaned); targets whose weighted samples are all excluded
+    keep their original weights and are marked in the boolean ``orphaned``.
+    """
+    excluded = np.asarray(excluded, dtype=bool)
+    weights = np.where(excluded[plan.indices], 0.0, plan.weights)
+    totals = weights.sum(axis=1, keepdims=True)
+    orphaned = totals[:, 0] == 0
+    weights = np.where(orphaned[:, None], plan.weights, weights / np.where(orphaned[:, None], 1.0, totals))
+    return plan._replace(weights=weights), orphaned
+
+
+def leave_one_out_error(sample_lats, sample_lons, values, k=IDW_NEIGHBOURS, power=IDW_POWER):
+    """RMSE of predicting each sample by IDW from the others
+
+    ``values`` is (n_samples,) or (n_samples, n_variables); returns a float
+    or one RMSE per variable. This estimates the error of interpolating to a
+    point between samples; NaN with fewer than two samples.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(sample_lats)
+    if n < 2:
+        return np.full(values.shape[1:], np.nan) if values.ndim > 1 else float('nan')
+
+    distances = pairwise_km(sample_lats, sample_lons, sample_lats, sample_lons)
+    np.fill_diagonal(distances, np.inf)
+    k = max(1, min(k, n - 1))
+    indices = np.argpartition(distances, k - 1, axis=1)[:, :k]
+    nearest = np.take_along_axis(distances, indices, axis=1)
+    # Co-located samples predict each other exactly
+    with np.errstate(divide='ignore'):
+        weights = 1.0 / np.maximum(nearest, 1e-9) ** power
+    weights /= weights.sum(axis=1, keepdims=True)
+
+    residuals = interpolate(values, indices, weights) - values
+    rmse = np.sqrt(np.nanmean(residuals ** 2, axis=0))
+    return rmse if values.ndim > 1 else float(rmse)
+
+
+def grid_leave_one_out_error(sample_lats, sample_lons, values, step_deg):
+    """RMSE of predicting each grid node bilinearly from the nodes around it
+
+    Without the node, it is the centre of the cell formed by its four
+    diagonal neighbours, so the bilinear prediction is their mean; a node
+    lacking those is predicted from its two neighbours along a row or column.
+    Nodes with neither are skipped. This is the error of a grid twice as
+    coarse, so it overstates the plan's own error; NaN when no node can be
+    predicted. ``values`` is shaped as for leave_one_out_error.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(sample_lats)
+    if n < 2:
+        return np.full(values.shape[1:], np.nan) if values.ndim > 1 else float('nan')
+
+    sample_lats = np.asarray(sample_lats, dtype=np.float64)
+    sample_lons = np.asarray(sample_lons, dtype=np.float64)
+    rows = np.rint((sample_lats - sample_lats.min()) / step_deg).astype(np.int64) + 1
+    cols = np.rint((sample_lons - sample_lons.min()) / step_deg).astype(np.int64) + 1
+    # Node index per grid position, padded by one so neighbours never fall outside
+    lookup = np.full((rows.max() + 2, cols.max() + 2), -1)
+    lookup[rows, cols] = np.arange(n)
+
+    predicted = np.full(values.shape, np.nan)
+    done = np.zeros(n, dtype=bool)
+    for stencil in (((-1, -1), (-1, 1), (1, -1), (1, 1)), ((0, -1), (0, 1)), ((-1, 0), (1, 0))):
+        neighbours = np.stack([lookup[rows + dr, cols + dc] for dr, dc in stencil], axis=1)
+        usable = ~done & (neighbours >= 0).all(axis=1)
+        predicted[usable] = values[neighbours[usable]].mean(axis=1)
+        done |= usable
+
+    if not done.any():
+        return np.full(values.shape[1:], np.nan) if values.ndim > 1 else float('nan')
+    residuals = predicted[done] - values[done]
+    rmse = np.sqrt(np.nanmean(residuals ** 2, axis=0))
+    return rmse if values.ndim > 1 else float(rmse)
@@ -0,0 +1,129 @@
+import hashlib
+from datetime import date as date_type, datetime
+import numpy as np
+from config import SYNTHETIC_DATA_SALT
+
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+WEATHER_DESCRIPTIONS = ('Clear sky', 'Partly cloudy', 'Overcast', 'Light rain')
+
+
+def _splitmix64(x):
+    """SplitMix64 finalizer over a uint64 array (wrapping arithmetic)"""
+    x = (x + _GOLDEN).astype(np.uint64)
+    x = (x ^ (x >> np.uint64(30))) * _MIX1
+    x = (x ^ (x >> np.uint64(27))) * _MIX2
+    return x ^ (x >> np.uint64(31))
+
+
+def _as_date(value):
+    if value is None:
+        return datetime.now().date()
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date_type):
+        return value
+    return datetime.fromisoformat(str(value)).date()
+
+
+class SyntheticDataProvider:
+    """Deterministic synthetic data keyed by (county, indicator, date)
+
+    Every value is a pure function of its key and ``salt``: seeds come from
+    BLAKE2b, not Python's per-process ``hash()``, and samples come from a
+    counter-based SplitMix64 stream. The same inputs give the same outputs in
+    every process, so results can be cached and shared. Batch methods take
+    many counties at once, and each county's values do not depend on which
+    other counties are in the batch.
+    """
+
+    def __init__(self, salt=SYNTHETIC_DATA_SALT):
+        self.salt = salt
+
+    def seed(self, *parts):
+        """Stable 64-bit seed for a key such as (county, indicator, date)"""
+        text = '|'.join(str(p) for p in (self.salt,) + parts)
+        return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'little')
+
+    def seeds(self, keys, *parts):
+        """Seeds for many keys that share the trailing ``parts``"""
+        return np.array([self.seed(key, *parts) for key in keys], dtype=np.uint64)
+
+    def generator(self, *parts):
+        """A NumPy Generator seeded from a key, for callers that need a full RNG"""
+        return np.random.default_rng(self.seed(*parts))
+
+    def uniform(self, seeds, shape):
+        """Uniform [0, 1) samples of ``shape`` for each seed; returns (n_seeds, *shape)"""
+        seeds = np.atleast_1d(np.asarray(seeds, dtype=np.uint64))
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        counters = np.arange(int(np.prod(shape)), dtype=np.uint64) * _GOLDEN
+        bits = _splitmix64(_splitmix64(seeds)[:, None] ^ counters[None, :])
+        return ((bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53).reshape((len(seeds),) + shape)
+
+    def normal(self, seeds, shape):
+        """Standard normal samples of ``shape`` for each seed (Box-Muller)"""
+        shape = (shape,) if np.isscalar(shape) else tuple(shape)
+        u = self.uniform(seeds, (2,) + shape)
+        return np.sqrt(-2.0 * np.log1p(-u[:, 0])) * np.cos(2 * np.pi * u[:, 1])
+
+    def county_factor(self, counties):
+        """Stable per-county offset in [0, 1), one per county"""
+        return self.uniform(self.seeds(counties, 'county-factor'), 1)[:, 0]
+
+    def weather(self, counties, date=None):
+        """Mock current weather and 5-day forecast arrays for many counties"""
+        day = _as_date(date)
+        seeds = self.seeds(counties, 'weather', day.isoformat())
+        noise = self.normal(seeds, 18)
+        pick = self.uniform(seeds ^ np.uint64(1), 1)[:, 0]
+
+        base_temp = 28 + 5 * noise[:, 0]
+        humidity = 65 + 15 * noise[:, 1]
+        wind_speed = 8 + 3 * noise[:, 2]
+        forecast_noise = noise[:, 3:].reshape(-1, 5, 3)
+        temp_variation = 3 * forecast_noise[:, :, 0]
+
+        return {
+            'temperature': base_temp,
+            'humidity': humidity,
+            'wind_speed': wind_speed,
+            'description_index': (pick * len(WEATHER_DESCRIPTIONS)).astype(int),
+            'forecast_min_temp': np.maximum(15, base_temp[:, None] + temp_variation - 5),
+            'forecast_max_temp': np.minimum(45, base_temp[:, None] + temp_variation + 5),
+            'forecast_humidity': np.clip(humidity[:, None] + 10 * forecast_noise[:, :, 1], 20, 90),
+            'forecast_rainfall_prob': np.clip(30 + 25 * forecast_noise[:, :, 2], 0, 100)
+        }
+
+    def raster_noise(self, county, indicator, shape, date=None):
+        """Uniform [0, 1) noise grid for one county/indicator/date"""
+        return self.uniform(self.seed(county, indicator, 'raster', _as_date(date).isoformat()), shape)[0]
+
+    def daily_noise(self, counties, indicator, dates):
+        """Standard normal noise per (county, day), shape (n_counties, n_days)
+
+        Each day's value depends only on (county, indicator, day), so a longer
+        or shifted date range reproduces the overlapping days exactly.
+        """
+        day_numbers = np.array([_as_date(d).toordinal() for d in dates], dtype=np.uint64)
+        county_seeds = self.seeds(counties, indicator, 'daily')
+        u = np.empty((2, len(county_seeds), len(day_numbers)))
+        for j in range(2):
+            bits = _splitmix64(_splitmix64(county_seeds)[:, None] ^ (day_numbers * np.uint64(2) + np.uint64(j)) * _GOLDEN)
+            u[j] = (bits >> np.uint64(11)).astype(np.float64) * 2.0 ** -53
+        return np.sqrt(-2.0 * np.log1p(-u[0])) * np.cos(2 * np.pi * u[1])
+
+
+_default_provider = SyntheticDataProvider()
+
+
+def get_synthetic_provider():
+    """The default provider used by services that were not given one"""
+    return _default_provider
+
+
+def set_synthetic_provider(provider):
+    """Swap the default provider, e.g. for a different salt or backend"""
+    global _default_provider
+    _default_provider = provider
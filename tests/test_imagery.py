@@ -0,0 +1,42 @@
+import os
+import numpy as np
+from imagery import ImageryTileCache, decode_image, vegetation_index
+
+FIXTURES = os.path.join(os.path.dirname(__file__), 'fixtures')
+
+
+def read_fixture(name):
+    with open(os.path.join(FIXTURES, name), 'rb') as f:
+        return f.read()
+
+
+def test_decode_fixture_tile_and_vegetation_index():
+    rgb = decode_image(read_fixture('ndvi_tile.png'))
+
+    assert rgb.shape == (2, 3, 3)
+    assert rgb.dtype == np.uint8
+    np.testing.assert_array_equal(rgb[0, 0], [40, 120, 30])
+    np.testing.assert_array_equal(rgb[1, 2], [0, 255, 0])
+
+    index = vegetation_index(rgb)
+    assert index.dtype == np.float32
+    np.testing.assert_allclose(index, [
+        [(120 - 40) / 160, (110 - 160) / 270, (40 - 20) / 60],
+        [0.0, 0.0, 1.0]
+    ], rtol=1e-6)
+
+
+def test_failed_fetch_is_not_retried_within_ttl(tmp_path):
+    cache = ImageryTileCache(root=str(tmp_path), failure_ttl=60)
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return None
+
+    assert cache.get_or_fetch(4.85, 31.6, 0.1, '2026-01-01', fetch) is None
+    assert cache.get_or_fetch(4.85, 31.6, 0.1, '2026-01-01', fetch) is None
+    assert len(calls) == 1
+
+    tile = cache.get_or_fetch(4.85, 31.6, 0.1, '2026-01-02', lambda: read_fixture('ndvi_tile.png'))
+    assert tile.shape == (2, 3, 3)
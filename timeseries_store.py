@@ -0,0 +1,247 @@
+import json
+import os
+import re
+import threading
+from contextlib import contextmanager
+import numpy as np
+from config import CACHE_DIR, TIMESERIES_HISTORY_DAYS
+from county_registry import COUNTY_REGISTRY
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within the process
+    fcntl = None
+
+
+def _day_number(date):
+    """Days since 1970-01-01 for a date, datetime or date string"""
+    return int(np.datetime64(str(date)[:10], 'D').astype(np.int64))
+
+
+class TimeSeriesStore:
+    """Append-only daily history per indicator, one column per county
+
+    Each indicator directory holds two flat binary files: ``dates.i4`` (a
+    sorted int32 index of days since the epoch) and ``values.f4`` (float32
+    rows of ``n_counties`` values, one row per date). New days are appended
+    to the end of both files; the dates file is written last, so a row only
+    exists once its date does. Range queries binary-search the memory-mapped
+    date index and return a slice of the value matrix.
+    """
+
+    def __init__(self, root=os.path.join(CACHE_DIR, 'timeseries'), county_names=None,
+                 history_days=TIMESERIES_HISTORY_DAYS):
+        self.root = root
+        self.county_names = tuple(county_names or COUNTY_REGISTRY.county_names)
+        self.county_index = {county: i for i, county in enumerate(self.county_names)}
+        self.history_days = history_days
+        self._lock = threading.Lock()
+        self._stats = {'appended_days': 0, 'queries': 0}
+        os.makedirs(self.root, exist_ok=True)
+
+    def _dir(self, indicator):
+        slug = re.sub(r'[^a-z0-9]+', '_', indicator.lower()).strip('_')
+        return os.path.join(self.root, slug)
+
+    def _open(self, indicator):
+        """(dates, values) memmaps for an indicator; empty arrays when it has no history"""
+        directory = self._dir(indicator)
+        dates_path = os.path.join(directory, 'dates.i4')
+        values_path = os.path.join(directory, 'values.f4')
+        n_dates = os.path.getsize(dates_path) // 4 if os.path.exists(dates_path) else 0
+        if n_dates == 0:
+            return np.empty(0, dtype=np.int32), np.empty((0, len(self.county_names)), dtype=np.float32)
+        dates = np.memmap(dates_path, dtype=np.int32, mode='r', shape=(n_dates,))
+        values = np.memmap(values_path, dtype=np.float32, mode='r', shape=(n_dates, len(self.county_names)))
+        return dates, values
+
+    def _prepare(self, indicator):
+        """Create the indicator directory, resetting it if the county columns changed"""
+        directory = self._dir(indicator)
+        columns_path = os.path.join(directory, 'counties.json')
+        os.makedirs(directory, exist_ok=True)
+        try:
+            with open(columns_path) as f:
+                if tuple(json.load(f)) == self.county_names:
+                    self._truncate_torn_rows(directory)
+                    return directory
+        except (OSError, ValueError):
+            pass
+
+        for name in ('dates.i4', 'values.f4'):
+            try:
+                os.remove(os.path.join(directory, name))
+            except OSError:
+                pass
+        with open(columns_path, 'w') as f:
+            json.dump(self.county_names, f)
+        return directory
+
+    def _truncate_torn_rows(self, directory):
+        # Rows written without their date (an interrupted append) are dropped
+        dates_path = os.path.join(directory, 'dates.i4')
+        values_path = os.path.join(directory, 'values.f4')
+        n_dates = os.path.getsize(dates_path) // 4 if os.path.exists(dates_path) else 0
+        row_bytes = 4 * len(self.county_names)
+        if os.path.exists(values_path) and os.path.getsize(values_path) != n_dates * row_bytes:
+            with open(values_path, 'r+b') as f:
+                f.truncate(n_dates * row_bytes)
+
+    @contextmanager
+    def _file_lock(self, indicator):
+        """Exclusive lock on an indicator's files, shared by every process using the store"""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self._dir(indicator), exist_ok=True)
+        with open(os.path.join(self._dir(indicator), '.lock'), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def last_date(self, indicator):
+        """The newest stored date as numpy datetime64[D], or None"""
+        dates, _ = self._open(indicator)
+        return dates[-1].astype('datetime64[D]') if len(dates) else None
+
+    def append(self, indicator, dates, values):
+        """Append rows for dates after the newest stored one
+
+        ``values`` has shape (n_dates, n_counties). Dates that are already
+        stored are skipped, so repeated appends are harmless.
+        """
+        days = np.array([_day_number(d) for d in dates], dtype=np.int32)
+        values = np.asarray(values, dtype=np.float32).reshape(len(days), len(self.county_names))
+        order = np.argsort(days, kind='stable')
+        days, values = days[order], values[order]
+
+        with self._lock, self._file_lock(indicator):
+            directory = self._prepare(indicator)
+            stored, _ = self._open(indicator)
+            if len(stored):
+                keep = days > stored[-1]
+                days, values = days[keep], values[keep]
+            if len(days) == 0:
+                return 0
+            with open(os.path.join(directory, 'values.f4'), 'ab') as f:
+                f.write(np.ascontiguousarray(values).tobytes())
+            with open(os.path.join(directory, 'dates.i4'), 'ab') as f:
+                f.write(days.tobytes())
+            self._stats['appended_days'] += len(days)
+        return len(days)
+
+    def extend(self, indicator, end, builder):
+        """Append every missing day up to ``end``
+
+        ``builder(dates)`` returns an (n_dates, n_counties) array. A new
+        indicator starts ``history_days`` before ``end``.
+        """
+        end_day = _day_number(end)
+        last = self.last_date(indicator)
+        start_day = int(last.astype(np.int64)) + 1 if last is not None else end_day - self.history_days + 1
+        if start_day > end_day:
+            return 0
+        dates = np.arange(start_day, end_day + 1).astype('datetime64[D]').astype(object)
+        return self.append(indicator, dates, builder(dates))
+
+    def query(self, indicator, start, end, counties=None):
+        """(dates, values) for start <= date <= end
+
+        ``dates`` is a datetime64[D] array and ``values`` an (n_dates, k)
+        array, for the given counties or all of them. All-county queries
+        return a read-only view of the memory-mapped file.
+        """
+        dates, values = self._open(indicator)
+        lo = int(np.searchsorted(dates, _day_number(start), side='left'))
+        hi = int(np.searchsorted(dates, _day_number(end), side='right'))
+        rows = values[lo:hi]
+        if counties is not None:
+            rows = rows[:, [self.county_index[county] for county in counties]]
+        with self._lock:
+            self._stats['queries'] += 1
+        return np.asarray(dates[lo:hi]).astype('datetime64[D]'), rows
+
+    def stats(self):
+        with self._lock:
+            return dict(self._stats)
+
+
+_timeseries_store = None
+_timeseries_store_lock = threading.Lock()
+
+
+def get_timeseries_store():
+    """Return the process-wide time-series store"""
+    global _timeseries_store
+    if _timeseries_store is None:
+        with _timeseries_store_lock:
+            if _timeseries_store is None:
+                _timeseries_store = TimeSeriesStore()
+    return _timeseries_store
+
+
+def lttb_indices(x, y, n_out):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets
+
+    The first and last points are always kept. Each interior bucket keeps
+    the point forming the largest triangle with the previously kept point
+    and the mean of the next bucket.
+    """
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+
+    # Mean point of every bucket, used as the third triangle vertex
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[:-1], edges[:-1])[:len(counts)] / counts
+    mean_y = np.add.reduceat(y[:-1], edges[:-1])[:len(counts)] / counts
+    mean_x = np.append(mean_x, x[-1])
+    mean_y = np.append(mean_y, y[-1])
+
+    kept = np.empty(n_out, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        cx, cy = mean_x[i + 1], mean_y[i + 1]
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        kept[i + 1] = a
+    return kept
+
+
+def min_max_indices(y, n_out):
+    """Indices of each bucket's minimum and maximum, in order (about ``n_out`` points)"""
+    n = len(y)
+    if n_out >= n or n_out < 2:
+        return np.arange(n)
+    y = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(0, n, n_out // 2 + 1).astype(np.int64)
+    kept = []
+    for lo, hi in zip(edges[:-1], edges[1:]):
+        block = y[lo:hi]
+        if np.isnan(block).all():  # A gap in the data
+            continue
+        kept += [lo + int(np.nanargmin(block)), lo + int(np.nanargmax(block))]
+    return np.unique(np.array(kept, dtype=np.int64))
+
+
+def downsample_series(x, y, max_points, method='lttb'):
+    """Indices of at most about ``max_points`` points that keep a series' shape
+
+    ``method`` is 'lttb' or 'minmax'. The global minimum and maximum are
+    always kept, so extremes survive any reduction.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    if method == 'minmax':
+        return min_max_indices(y, max_points)
+    kept = lttb_indices(x, y, max_points - 2)
+    y = np.asarray(y)
+    return np.unique(np.concatenate([kept, [int(np.nanargmin(y)), int(np.nanargmax(y))]]))
@@ -1,14 +1,98 @@
 
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict, namedtuple
 import streamlit as st
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
 import numpy as np
-from config import TEMP_NORMAL_RANGE, HUMIDITY_OPTIMAL_RANGE
+from config import TEMP_NORMAL_RANGE, HUMIDITY_OPTIMAL_RANGE, FIGURE_CACHE_MAX_ENTRIES
+
+# A built chart with its serialized spec and what each step cost
+FigureEntry = namedtuple('FigureEntry', ['figure', 'spec', 'build_ms', 'serialize_ms'])
+
+
+def content_hash(*parts):
+    """Stable digest of chart inputs (records, DataFrames, scalars)"""
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, pd.DataFrame):
+            digest.update(json.dumps(list(map(str, part.columns))).encode())
+            digest.update(pd.util.hash_pandas_object(part, index=True).to_numpy().tobytes())
+        else:
+            digest.update(json.dumps(part, sort_keys=True, default=str).encode())
+        digest.update(b'\x00')
+    return digest.hexdigest()
+
+
+class FigureCache:
+    """Built Plotly figures keyed by chart name and a content hash of their inputs
+
+    A hit returns the figure built and serialized earlier, so an unchanged
+    chart costs one hash on rerun. Figures are shared and must not be mutated.
+    """
+
+    def __init__(self, max_entries=FIGURE_CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0}
+
+    def get_or_build(self, chart, inputs, build):
+        """(entry, hit) for ``chart`` with these inputs, calling ``build()`` on a miss"""
+        key = (chart, content_hash(*inputs))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._stats['hits'] += 1
+                return entry, True
+            self._stats['misses'] += 1
+
+        started = time.perf_counter()
+        figure = build()
+        built = time.perf_counter()
+        spec = pio.to_json(figure, validate=False)
+        entry = FigureEntry(figure, spec, (built - started) * 1000, (time.perf_counter() - built) * 1000)
+        with self._lock:
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return entry, False
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+        return stats
+
+
+# Shared by every session: UIComponents is recreated on each script run
+_figure_cache = FigureCache()
+
 
 class UIComponents:
     def __init__(self):
+        self.figures = _figure_cache
+        self.chart_timings = {}
         self.setup_custom_css()
+
+    def _cached_figure(self, chart, inputs, build):
+        """The cached figure for these inputs, recording this run's timings for ``chart``"""
+        started = time.perf_counter()
+        entry, hit = self.figures.get_or_build(chart, inputs, build)
+        self.chart_timings[chart] = {
+            'cached': hit,
+            'lookup_ms': (time.perf_counter() - started) * 1000,
+            'build_ms': entry.build_ms,
+            'serialize_ms': entry.serialize_ms,
+            'payload_bytes': len(entry.spec)
+        }
+        return entry.figure
     
     def setup_custom_css(self):
         """Setup custom CSS styling"""
@@ -101,11 +185,24 @@ class UIComponents:
         </div>
         """, unsafe_allow_html=True)
     
-    def render_forecast_chart(self, forecast_data):
-        """Render temperature forecast chart"""
+    def render_forecast_chart(self, forecast_data, hourly=None):
+        """Render temperature forecast chart, with the 3-hourly series when available"""
+        return self._cached_figure(
+            'forecast', (forecast_data, hourly), lambda: self._build_forecast_chart(forecast_data, hourly)
+        )
+
+    def _build_forecast_chart(self, forecast_data, hourly):
         forecast_df = pd.DataFrame(forecast_data)
         
         fig = go.Figure()
+        if hourly is not None:
+            fig.add_trace(go.Scatter(
+                x=hourly['time'],
+                y=hourly['temp'],
+                mode='lines',
+                name='3-hourly Temp',
+                line=dict(color='gray', dash='dot')
+            ))
         fig.add_trace(go.Scatter(
             x=forecast_df['date'],
             y=forecast_df['max_temp'],
@@ -131,6 +228,9 @@ class UIComponents:
     
     def render_rainfall_chart(self, forecast_data):
         """Render rainfall probability chart"""
+        return self._cached_figure('rainfall', (forecast_data,), lambda: self._build_rainfall_chart(forecast_data))
+
+    def _build_rainfall_chart(self, forecast_data):
         forecast_df = pd.DataFrame(forecast_data)
         
         fig = px.bar(
@@ -146,6 +246,11 @@ class UIComponents:
     
     def render_risk_distribution_chart(self, risk_counts):
         """Render risk distribution chart"""
+        return self._cached_figure(
+            'risk_distribution', (risk_counts,), lambda: self._build_risk_distribution_chart(risk_counts)
+        )
+
+    def _build_risk_distribution_chart(self, risk_counts):
         fig = px.bar(
             risk_counts,
             x='State',
@@ -163,3 +268,11 @@ class UIComponents:
         fig.update_xaxes(tickangle=45)
         fig.update_layout(height=500)
         return fig
+
+    def render_chart_timings(self):
+        """Sidebar table of this run's chart build and serialization costs (shown with SUDDAI_DEBUG=1)"""
+        if not self.chart_timings:
+            return
+        with st.sidebar.expander("⚙️ Chart timings"):
+            timings = pd.DataFrame.from_dict(self.chart_timings, orient='index')
+            st.dataframe(timings.round(2), use_container_width=True)
@@ -1,160 +1,584 @@
-import requests
 import pandas as pd
 import numpy as np
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 from config import OPENWEATHER_API_KEY, WEATHER_API_KEY, TEMP_NORMAL_RANGE, HUMIDITY_OPTIMAL_RANGE
 from config import DROUGHT_TEMP_THRESHOLD, DROUGHT_HUMIDITY_THRESHOLD, FLOOD_HUMIDITY_THRESHOLD, FLOOD_RAIN_THRESHOLD
+from config import REGIONAL_FETCH_WORKERS, WEATHER_CACHE_TTLS
+from config import REGIONAL_SAMPLING_MODE, REGIONAL_SAMPLING_CELL_DEG, REGIONAL_GRID_STEP_DEG
+from config import OPENWEATHER_CALLS_PER_MINUTE, OPENWEATHER_BURST, RATE_LIMIT_MAX_WAIT
+from config import CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT, LAST_GOOD_TTL
+from http_client import get_http_client
+from county_registry import county_locations
+from cache import get_cache, get_weather_cache, make_cache_key
+from synthetic_data import get_synthetic_provider, WEATHER_DESCRIPTIONS
+from resilience import SingleFlight, TokenBucket, CircuitBreaker, CircuitOpenError, RateLimitTimeout
+from spatial_interpolation import cell_plan, grid_plan, interpolate, exclude_samples, pairwise_km
+from spatial_interpolation import leave_one_out_error, grid_leave_one_out_error
 
-class WeatherService:
-    def __init__(self):
+# Shared by every WeatherService instance, i.e. by all Streamlit sessions in the process
+_upstream_flight = SingleFlight()
+_upstream_limiter = TokenBucket(OPENWEATHER_CALLS_PER_MINUTE, OPENWEATHER_BURST)
+_upstream_breakers = {
+    endpoint: CircuitBreaker(endpoint, CIRCUIT_FAILURE_THRESHOLD, CIRCUIT_RECOVERY_TIMEOUT)
+    for endpoint in WEATHER_CACHE_TTLS
+}
+
+# Risk classes in rule priority order; detect_anomaly_batch returns indices into this tuple
+ANOMALY_CLASSES = (
+    {
+        'risk': 'High Drought Risk',
+        'advisory': 'Consider drought-resistant crops. Implement water conservation measures.',
+        'color': 'red',
+        'confidence_range': (0.75, 0.95)
+    },
+    {
+        'risk': 'Flood Risk',
+        'advisory': 'Monitor water levels. Prepare drainage systems.',
+        'color': 'blue',
+        'confidence_range': (0.65, 0.85)
+    },
+    {
+        'risk': 'Weather Anomaly',
+        'advisory': 'Monitor crop conditions closely. Adjust farming schedule.',
+        'color': 'orange',
+        'confidence_range': (0.55, 0.75)
+    },
+    {
+        'risk': 'Normal Conditions',
+        'advisory': 'Conditions are favorable for normal farming activities.',
+        'color': 'green',
+        'confidence_range': (0.80, 0.95)
+    }
+)
+_RISK_LABELS = np.array([c['risk'] for c in ANOMALY_CLASSES], dtype=object)
+_RISK_COLORS = np.array([c['color'] for c in ANOMALY_CLASSES], dtype=object)
+_CONFIDENCE_LOW = np.array([c['confidence_range'][0] for c in ANOMALY_CLASSES])
+_CONFIDENCE_HIGH = np.array([c['confidence_range'][1] for c in ANOMALY_CLASSES])
+
+# Numeric fields blended when county weather is interpolated from sample points
+_CURRENT_FIELDS = ('temperature', 'humidity', 'wind_speed')
+_FORECAST_FIELDS = ('min_temp', 'max_temp', 'mean_temp', 'humidity', 'rainfall_prob')
+
+
+def weather_source(weather):
+    """'live', 'stale' (last known good response) or 'mock' for a weather dict"""
+    if weather.get('mock'):
+        return 'mock'
+    return 'stale' if weather.get('stale') else 'live'
+
+
+class WeatherCore:
+    """Weather logic that does not depend on how payloads are fetched
+
+    Parses OpenWeatherMap payloads, generates mock data, classifies risk and
+    builds regional frames. Also holds the process-wide response cache, rate
+    limit and circuit breakers that WeatherService and AsyncWeatherService
+    both fetch through.
+    """
+
+    def __init__(self, synthetic=None, limiter=None):
+        self.synthetic = synthetic or get_synthetic_provider()
         self.api_key = OPENWEATHER_API_KEY or WEATHER_API_KEY
         self.base_url = "http://api.openweathermap.org/data/2.5"
+        self.cache = get_weather_cache()
+        self.limiter = limiter or _upstream_limiter
+        self.breakers = _upstream_breakers
+        self.last_good = get_cache('last_good')
 
-    def get_weather_data(self, lat, lon, county_name):
-        """Get weather data for a specific location using OpenWeatherMap API"""
-        try:
-            # Get current weather
-            current_url = f"{self.base_url}/weather"
-            current_params = {
-                'lat': lat,
-                'lon': lon,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
+    def upstream_request(self, endpoint, lat, lon):
+        """(url, params) of an OpenWeatherMap call"""
+        params = {
+            'lat': lat,
+            'lon': lon,
+            'appid': self.api_key,
+            'units': 'metric'
+        }
+        return f"{self.base_url}/{endpoint}", params
 
-            current_response = requests.get(current_url, params=current_params)
+    def build_weather(self, current, forecast):
+        """Weather dict from (payload, age_seconds) pairs of the two endpoints, or None if one is missing
 
-            # Get 5-day forecast
-            forecast_url = f"{self.base_url}/forecast"
-            forecast_params = {
-                'lat': lat,
-                'lon': lon,
-                'appid': self.api_key,
-                'units': 'metric'
-            }
+        An age that is not None means the payload is a last known good
+        response, and the result is marked ``stale`` with the oldest age.
+        """
+        (current_data, current_age), (forecast_data, forecast_age) = current, forecast
+        if current_data is None or forecast_data is None:
+            return None
+        hourly = self._parse_forecast_slots(forecast_data)
+        weather = {
+            'current': self._parse_current(current_data),
+            'forecast': self._parse_forecast(hourly),
+            'hourly': hourly
+        }
+        ages = [age for age in (current_age, forecast_age) if age is not None]
+        if ages:
+            weather['stale'] = True
+            weather['age_seconds'] = max(ages)
+        return weather
 
-            forecast_response = requests.get(forecast_url, params=forecast_params)
-
-            if current_response.status_code == 200 and forecast_response.status_code == 200:
-                current_data = current_response.json()
-                forecast_data = forecast_response.json()
-
-                # Process current weather
-                current = {
-                    'temperature': round(current_data['main']['temp'], 1),
-                    'humidity': current_data['main']['humidity'],
-                    'wind_speed': round(current_data['wind']['speed'] * 3.6, 1),  # Convert m/s to km/h
-                    'description': current_data['weather'][0]['description'].title()
-                }
-
-                # Process 5-day forecast (take one forecast per day)
-                forecast = []
-                processed_dates = set()
-
-                for item in forecast_data['list'][:40]:  # 40 forecasts for 5 days
-                    date = datetime.fromtimestamp(item['dt']).strftime('%Y-%m-%d')
-                    if date not in processed_dates and len(forecast) < 5:
-                        forecast.append({
-                            'date': date,
-                            'min_temp': round(item['main']['temp_min'], 1),
-                            'max_temp': round(item['main']['temp_max'], 1),
-                            'humidity': item['main']['humidity'],
-                            'rainfall_prob': item.get('pop', 0) * 100  # Probability of precipitation
-                        })
-                        processed_dates.add(date)
-
-                return {
-                    'current': current,
-                    'forecast': forecast
-                }
-            else:
-                # Fallback to mock data if API fails
-                return self._get_mock_data(lat, lon, county_name)
+    def _parse_current(self, current_data):
+        """Process current weather"""
+        return {
+            'temperature': round(current_data['main']['temp'], 1),
+            'humidity': current_data['main']['humidity'],
+            'wind_speed': round(current_data['wind']['speed'] * 3.6, 1),  # Convert m/s to km/h
+            'description': current_data['weather'][0]['description'].title()
+        }
 
-        except Exception as e:
-            print(f"Weather API error: {e}")
-            # Fallback to mock data
-            return self._get_mock_data(lat, lon, county_name)
+    def _parse_forecast_slots(self, forecast_data):
+        """All 3-hourly forecast slots as a DataFrame, in the location's local time
+
+        Each field is pulled out of the payload once into an array; the frame
+        has columns time, temp, temp_min, temp_max, humidity and rainfall_prob.
+        """
+        items = forecast_data['list'][:40]  # 40 forecasts for 5 days
+        n = len(items)
+        mains = [item['main'] for item in items]
+        offset = forecast_data.get('city', {}).get('timezone', 0)  # Seconds east of UTC
+        timestamps = np.fromiter((item['dt'] for item in items), dtype=np.int64, count=n) + offset
+
+        return pd.DataFrame({
+            'time': pd.to_datetime(timestamps, unit='s'),
+            'temp': np.fromiter((m['temp'] for m in mains), dtype=float, count=n),
+            'temp_min': np.fromiter((m['temp_min'] for m in mains), dtype=float, count=n),
+            'temp_max': np.fromiter((m['temp_max'] for m in mains), dtype=float, count=n),
+            'humidity': np.fromiter((m['humidity'] for m in mains), dtype=float, count=n),
+            'rainfall_prob': np.fromiter((item.get('pop', 0) for item in items), dtype=float, count=n) * 100
+        })
+
+    def _parse_forecast(self, slots):
+        """Process 5-day forecast: daily extremes and means over every slot of each local day"""
+        if slots.empty:
+            return []
+        # Slots are in time order, so each local day is one contiguous run
+        days = slots['time'].to_numpy(dtype='datetime64[D]')
+        starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])[:5]
+        stop = starts[-1] + np.count_nonzero(days == days[starts[-1]])
+        counts = np.diff(np.r_[starts, stop])
+
+        def reduce(column, ufunc):
+            return ufunc.reduceat(slots[column].to_numpy()[:stop], starts)
 
-    def _get_mock_data(self, lat, lon, county_name):
+        daily = {
+            'min_temp': reduce('temp_min', np.minimum),
+            'max_temp': reduce('temp_max', np.maximum),
+            'mean_temp': reduce('temp', np.add) / counts,
+            'humidity': reduce('humidity', np.add) / counts,
+            'rainfall_prob': reduce('rainfall_prob', np.maximum)  # Probability of precipitation
+        }
+        dates = np.datetime_as_string(days[starts])
+        return [
+            {'date': str(dates[i]), **{field: round(float(values[i]), 1) for field, values in daily.items()}}
+            for i in range(len(starts))
+        ]
+
+    def mock_weather(self, lat, lon, county_name):
         """Fallback mock data when API is unavailable"""
-        base_temp = 28 + np.random.normal(0, 5)
-        humidity = 65 + np.random.normal(0, 15)
-        wind_speed = 8 + np.random.normal(0, 3)
-
-        # Generate 5-day forecast
-        forecast = []
-        for i in range(5):
-            date = datetime.now() + timedelta(days=i)
-            temp_variation = np.random.normal(0, 3)
-            forecast.append({
-                'date': date.strftime('%Y-%m-%d'),
-                'min_temp': max(15, base_temp + temp_variation - 5),
-                'max_temp': min(45, base_temp + temp_variation + 5),
-                'humidity': max(20, min(90, humidity + np.random.normal(0, 10))),
-                'rainfall_prob': max(0, min(100, 30 + np.random.normal(0, 25)))
+        return self._get_mock_data_batch([county_name])[0]
+
+    def _get_mock_data_batch(self, county_names):
+        """Deterministic mock data for many counties, generated in one vectorized pass
+
+        Values depend only on (county, date), so repeated calls agree within a day.
+        """
+        today = datetime.now()
+        mock = self.synthetic.weather(county_names, today.date())
+        dates = [(today + timedelta(days=i)).strftime('%Y-%m-%d') for i in range(5)]
+
+        results = []
+        for c in range(len(county_names)):
+            # Generate 5-day forecast
+            forecast = [{
+                'date': dates[i],
+                'min_temp': float(mock['forecast_min_temp'][c, i]),
+                'max_temp': float(mock['forecast_max_temp'][c, i]),
+                'mean_temp': float(mock['forecast_min_temp'][c, i] + mock['forecast_max_temp'][c, i]) / 2,
+                'humidity': float(mock['forecast_humidity'][c, i]),
+                'rainfall_prob': float(mock['forecast_rainfall_prob'][c, i])
+            } for i in range(5)]
+
+            results.append({
+                'current': {
+                    'temperature': round(float(mock['temperature'][c]), 1),
+                    'humidity': round(max(20, min(90, float(mock['humidity'][c]))), 1),
+                    'wind_speed': round(max(0, float(mock['wind_speed'][c])), 1),
+                    'description': WEATHER_DESCRIPTIONS[mock['description_index'][c]]
+                },
+                'forecast': forecast,
+                'mock': True
             })
+        return results
 
+    def detect_anomaly(self, county_name, weather_data):
+        """Detect weather anomalies using ML-based approach"""
+        max_rain_prob = max((f['rainfall_prob'] for f in weather_data['forecast'][:3]), default=0)
+        result = self.detect_anomaly_batch(
+            [weather_data['current']['temperature']],
+            [weather_data['current']['humidity']],
+            [max_rain_prob]
+        )
+        anomaly_class = ANOMALY_CLASSES[result['advisory_index'][0]]
         return {
-            'current': {
-                'temperature': round(base_temp, 1),
-                'humidity': round(max(20, min(90, humidity)), 1),
-                'wind_speed': round(max(0, wind_speed), 1),
-                'description': np.random.choice(['Clear sky', 'Partly cloudy', 'Overcast', 'Light rain'])
-            },
-            'forecast': forecast
+            'risk': anomaly_class['risk'],
+            'confidence': float(result['confidence'][0]),
+            'advisory': anomaly_class['advisory'],
+            'color': anomaly_class['color']
         }
 
-    def detect_anomaly(self, county_name, weather_data):
-        """Detect weather anomalies using ML-based approach"""
-        temp = weather_data['current']['temperature']
-        humidity = weather_data['current']['humidity']
-
-        # Rule-based anomaly detection
-        if temp > DROUGHT_TEMP_THRESHOLD and humidity < DROUGHT_HUMIDITY_THRESHOLD:
-            return {
-                'risk': 'High Drought Risk',
-                'confidence': np.random.uniform(0.75, 0.95),
-                'advisory': 'Consider drought-resistant crops. Implement water conservation measures.',
-                'color': 'red'
-            }
-        elif humidity > FLOOD_HUMIDITY_THRESHOLD and any(f['rainfall_prob'] > FLOOD_RAIN_THRESHOLD for f in weather_data['forecast'][:3]):
-            return {
-                'risk': 'Flood Risk',
-                'confidence': np.random.uniform(0.65, 0.85),
-                'advisory': 'Monitor water levels. Prepare drainage systems.',
-                'color': 'blue'
-            }
-        elif temp < 20 or temp > 35:
-            return {
-                'risk': 'Weather Anomaly',
-                'confidence': np.random.uniform(0.55, 0.75),
-                'advisory': 'Monitor crop conditions closely. Adjust farming schedule.',
-                'color': 'orange'
+    def detect_anomaly_batch(self, temperatures, humidities, max_rain_probs):
+        """Classify many locations at once with NumPy masks
+
+        Takes equal-length arrays of current temperature, current humidity and
+        the maximum rain probability over the next 3 forecast days. Returns
+        arrays of risk label, colour, index into ANOMALY_CLASSES and
+        confidence. Confidence is deterministic: it scales within each class's
+        range with how far the readings are past the class thresholds.
+        """
+        temp = np.asarray(temperatures, dtype=float)
+        humidity = np.asarray(humidities, dtype=float)
+        rain = np.asarray(max_rain_probs, dtype=float)
+        normal_low, normal_high = TEMP_NORMAL_RANGE
+
+        # Rule-based anomaly detection, first matching rule wins
+        drought = (temp > DROUGHT_TEMP_THRESHOLD) & (humidity < DROUGHT_HUMIDITY_THRESHOLD)
+        flood = ~drought & (humidity > FLOOD_HUMIDITY_THRESHOLD) & (rain > FLOOD_RAIN_THRESHOLD)
+        anomaly = ~drought & ~flood & ((temp < normal_low) | (temp > normal_high))
+        index = np.select([drought, flood, anomaly], [0, 1, 2], default=3)
+
+        # Strength of the signal in [0, 1] for each class
+        normal_mid = (normal_low + normal_high) / 2
+        strength = np.select(
+            [drought, flood, anomaly],
+            [
+                ((temp - DROUGHT_TEMP_THRESHOLD) / 5 + (DROUGHT_HUMIDITY_THRESHOLD - humidity) / 15) / 2,
+                ((humidity - FLOOD_HUMIDITY_THRESHOLD) / 20 + (rain - FLOOD_RAIN_THRESHOLD) / 30) / 2,
+                np.maximum(normal_low - temp, temp - normal_high) / 10
+            ],
+            default=1 - np.abs(temp - normal_mid) / (normal_high - normal_mid)
+        )
+        low = _CONFIDENCE_LOW[index]
+        high = _CONFIDENCE_HIGH[index]
+        confidence = low + (high - low) * np.clip(strength, 0, 1)
+
+        return {
+            'risk': _RISK_LABELS[index],
+            'color': _RISK_COLORS[index],
+            'advisory_index': index,
+            'confidence': confidence
+        }
+
+    def sampling_plan(self, locations, sampling=REGIONAL_SAMPLING_MODE):
+        """SamplingPlan for 'cell' or 'grid' sampling, or None to fetch every county
+
+        None is also returned when the plan would not need fewer calls.
+        """
+        if sampling == 'county':
+            return None
+        lats = np.array([coords['lat'] for _, _, coords in locations], dtype=float)
+        lons = np.array([coords['lon'] for _, _, coords in locations], dtype=float)
+        if sampling == 'cell':
+            plan = cell_plan(lats, lons, REGIONAL_SAMPLING_CELL_DEG)
+        elif sampling == 'grid':
+            plan = grid_plan(lats, lons, REGIONAL_GRID_STEP_DEG)
+        else:
+            raise ValueError(f"Unknown regional sampling mode: {sampling}")
+        return plan if len(plan.sample_lats) < len(locations) else None
+
+    def sample_locations(self, locations, plan):
+        """(state, county, coords) for each sample point, named after its nearest county
+
+        The county name only picks the mock data used when a sample cannot be fetched.
+        """
+        lats = [coords['lat'] for _, _, coords in locations]
+        lons = [coords['lon'] for _, _, coords in locations]
+        nearest = pairwise_km(plan.sample_lats, plan.sample_lons, lats, lons).argmin(axis=1)
+        return [
+            (locations[i][0], locations[i][1], {'lat': round(float(lat), 4), 'lon': round(float(lon), 4)})
+            for i, lat, lon in zip(nearest, plan.sample_lats, plan.sample_lons)
+        ]
+
+    def interpolate_weathers(self, plan, sample_weathers):
+        """County weather dicts blended from the sample weathers
+
+        Current readings and daily forecast values are weighted averages;
+        descriptions and dates come from each county's highest-weight sample.
+        Hourly slots are not interpolated. Samples that fell back to mock data
+        are left out; a county whose samples are all mock is interpolated
+        from them and marked ``mock``.
+        """
+        plan, orphaned = exclude_samples(plan, [bool(w.get('mock')) for w in sample_weathers])
+        n_days = min(len(w['forecast']) for w in sample_weathers)
+        current = np.array([[w['current'][f] for f in _CURRENT_FIELDS] for w in sample_weathers], dtype=float)
+        forecast = np.array([
+            [[day[f] for f in _FORECAST_FIELDS] for day in w['forecast'][:n_days]]
+            for w in sample_weathers
+        ], dtype=float).reshape(len(sample_weathers), n_days, len(_FORECAST_FIELDS))
+        current = interpolate(current, plan.indices, plan.weights)
+        forecast = interpolate(forecast, plan.indices, plan.weights)
+        dominant = plan.indices[np.arange(len(plan.indices)), plan.weights.argmax(axis=1)]
+
+        weathers = []
+        for t, sample in enumerate(dominant):
+            source = sample_weathers[sample]
+            weather = {
+                'current': dict(
+                    {f: round(float(v), 1) for f, v in zip(_CURRENT_FIELDS, current[t])},
+                    description=source['current']['description']
+                ),
+                'forecast': [
+                    dict({f: float(v) for f, v in zip(_FORECAST_FIELDS, forecast[t, d])}, date=day['date'])
+                    for d, day in enumerate(source['forecast'][:n_days])
+                ]
             }
+            ages = [
+                sample_weathers[i]['age_seconds'] for i, w in zip(plan.indices[t], plan.weights[t])
+                if w > 0 and sample_weathers[i].get('stale')
+            ]
+            if ages:
+                weather['stale'] = True
+                weather['age_seconds'] = max(ages)
+            if orphaned[t]:
+                weather['mock'] = True
+            weathers.append(weather)
+        return weathers
+
+    def build_interpolated_frame(self, locations, plan, sample_weathers):
+        """Regional frame from interpolated county weather, with its error estimate
+
+        ``df.attrs['interpolation']`` records the sampling mode, sample and
+        county counts, the upstream calls saved, how many samples were mock
+        and how many counties had only mock samples, and the leave-one-out
+        RMSE of temperature, humidity and 3-day rain probability across the
+        live samples, each predicted from the others with the plan's own
+        method (see interpolation_summary).
+        """
+        df = self.build_regional_frame(locations, self.interpolate_weathers(plan, sample_weathers))
+        df.attrs['interpolation'] = self.interpolation_summary(locations, plan, sample_weathers)
+        return df
+
+    def interpolation_summary(self, locations, plan, sample_weathers):
+        """The ``attrs['interpolation']`` record of an interpolated regional frame
+
+        The leave-one-out error uses IDW for cell plans and bilinear
+        interpolation from the surrounding nodes for grid plans
+        (``loo_method``), over the samples that were not mock data.
+        """
+        mock = np.array([bool(w.get('mock')) for w in sample_weathers])
+        live = ~mock
+        values = np.array([
+            [w['current']['temperature'], w['current']['humidity'],
+             max((f['rainfall_prob'] for f in w['forecast'][:3]), default=0)]
+            for w in sample_weathers
+        ], dtype=float)
+        if plan.mode == 'grid':
+            loo_method = 'bilinear'
+            rmse = grid_leave_one_out_error(plan.sample_lats[live], plan.sample_lons[live], values[live], plan.step_deg)
         else:
-            return {
-                'risk': 'Normal Conditions',
-                'confidence': np.random.uniform(0.80, 0.95),
-                'advisory': 'Conditions are favorable for normal farming activities.',
-                'color': 'green'
+            loo_method = 'idw'
+            rmse = leave_one_out_error(plan.sample_lats[live], plan.sample_lons[live], values[live])
+        _, orphaned = exclude_samples(plan, mock)
+        return {
+            'mode': plan.mode,
+            'samples': len(sample_weathers),
+            'counties': len(locations),
+            'calls_saved': 2 * (len(locations) - len(sample_weathers)),
+            'mock_samples': int(mock.sum()),
+            'mock_counties': int(orphaned.sum()),
+            'loo_method': loo_method,
+            'loo_rmse': {
+                'Temperature': float(rmse[0]),
+                'Humidity': float(rmse[1]),
+                'Rain_Probability': float(rmse[2])
             }
+        }
+
+    def build_regional_frame(self, locations, weathers):
+        """Build the regional DataFrame column-wise, classifying all counties in one pass
+
+        ``locations`` is a list of (state, county, coords) matching ``weathers``.
+        ``Source`` is live/stale/mock (see weather_source) and ``Age_Seconds``
+        the age of the data behind it: 0 when live, NaN for mock data.
+        """
+        temperatures = [w['current']['temperature'] for w in weathers]
+        humidities = [w['current']['humidity'] for w in weathers]
+        max_rain_probs = [max((f['rainfall_prob'] for f in w['forecast'][:3]), default=0) for w in weathers]
+        anomalies = self.detect_anomaly_batch(temperatures, humidities, max_rain_probs)
+
+        return pd.DataFrame({
+            'State': [state for state, _, _ in locations],
+            'County': [county for _, county, _ in locations],
+            'Temperature': temperatures,
+            'Humidity': humidities,
+            'Risk_Level': anomalies['risk'],
+            'Confidence': anomalies['confidence'],
+            'Latitude': [coords['lat'] for _, _, coords in locations],
+            'Longitude': [coords['lon'] for _, _, coords in locations],
+            'Source': [weather_source(w) for w in weathers],
+            'Age_Seconds': [
+                np.nan if w.get('mock') else float(w.get('age_seconds', 0.0)) for w in weathers
+            ]
+        })
+
+
+class WeatherService(WeatherCore):
+    def __init__(self, synthetic=None, limiter=None):
+        super().__init__(synthetic, limiter)
+        self.http = get_http_client()
+        self.flight = _upstream_flight
+
+    def get_weather_data(self, lat, lon, county_name):
+        """Get weather data for a specific location using OpenWeatherMap API
+
+        When an endpoint is failing, its last known good response is served
+        instead and the result is marked ``stale`` with its ``age_seconds``.
+        Mock data, marked ``mock``, is only used when no good response was ever seen.
+        """
+        try:
+            # Get current weather and 5-day forecast (served from cache when fresh)
+            weather = self.build_weather(
+                self._fetch_or_last_good("weather", lat, lon),
+                self._fetch_or_last_good("forecast", lat, lon)
+            )
+            # Fallback to mock data if API fails
+            return weather if weather is not None else self.mock_weather(lat, lon, county_name)
+
+        except Exception as e:
+            print(f"Weather API error: {e}")
+            # Fallback to mock data
+            return self.mock_weather(lat, lon, county_name)
+
+    def _fetch_or_last_good(self, endpoint, lat, lon):
+        """Return (payload, age_seconds); age is None for a fresh payload"""
+        try:
+            data = self._fetch_endpoint(endpoint, lat, lon)
+            if data is not None:
+                return data, None
+        except CircuitOpenError:
+            pass
+        except Exception as e:
+            print(f"Weather API error ({endpoint}): {e}")
+
+        entry = self.last_good.get(make_cache_key(endpoint, lat, lon))
+        if entry is None:
+            return None, None
+        return entry['data'], time.time() - entry['fetched_at']
+
+    def _fetch_endpoint(self, endpoint, lat, lon):
+        """Fetch a raw OpenWeatherMap payload, using the shared TTL cache
+
+        Concurrent misses for the same key share one upstream call, and every
+        upstream call waits its turn on the provider rate limit. Raises
+        CircuitOpenError while the endpoint's breaker is open; when it
+        half-opens and a stale value exists, the probe runs in the background.
+        """
+        key = make_cache_key(endpoint, lat, lon)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        permit = self.breakers[endpoint].before_call()
+        if permit == CircuitBreaker.PROBE and self.last_good.get(key) is not None:
+            threading.Thread(
+                target=self._revalidate, args=(endpoint, lat, lon, key),
+                name=f"revalidate-{key}", daemon=True
+            ).start()
+            raise CircuitOpenError(f"Circuit '{endpoint}' is revalidating in the background")
+        return self.flight.do(key, lambda: self._fetch_upstream(endpoint, lat, lon, key, permit))
+
+    def _revalidate(self, endpoint, lat, lon, key):
+        try:
+            self.flight.do(key, lambda: self._fetch_upstream(endpoint, lat, lon, key, CircuitBreaker.PROBE))
+        except Exception as e:
+            print(f"Weather revalidation error ({endpoint}): {e}")
+
+    def _fetch_upstream(self, endpoint, lat, lon, key, permit=CircuitBreaker.ALLOW):
+        # Another caller may have filled the cache while we were queued
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Queued callers give up as soon as the breaker opens, and calls
+        # admitted before it opened are re-checked once they hold a token
+        breaker = self.breakers[endpoint]
+        self.limiter.acquire(timeout=RATE_LIMIT_MAX_WAIT, check=breaker.check)
+        if permit == CircuitBreaker.ALLOW:
+            breaker.before_call()
+        url, params = self.upstream_request(endpoint, lat, lon)
+        # Every retry is an upstream call too, so it takes its own token
+        retry_token = lambda: self.limiter.acquire(timeout=RATE_LIMIT_MAX_WAIT, check=breaker.check)
+        try:
+            response = self.http.get(url, params=params, before_retry=retry_token)
+        except (CircuitOpenError, RateLimitTimeout):
+            raise
+        except Exception:
+            breaker.record_failure()
+            raise
+        if response.status_code != 200:
+            breaker.record_failure()
+            return None
 
-    def get_regional_data(self, counties_data):
-        """Get weather data for all counties"""
-        all_data = []
-        for state, counties in counties_data.items():
-            for county, coords in counties.items():
-                weather = self.get_weather_data(coords['lat'], coords['lon'], county)
-                anomaly = self.detect_anomaly(county, weather)
-                all_data.append({
-                    'State': state,
-                    'County': county,
-                    'Temperature': weather['current']['temperature'],
-                    'Humidity': weather['current']['humidity'],
-                    'Risk_Level': anomaly['risk'],
-                    'Confidence': anomaly['confidence'],
-                    'Latitude': coords['lat'],
-                    'Longitude': coords['lon']
-                })
-        return pd.DataFrame(all_data)
\ No newline at end of file
+        breaker.record_success()
+        data = response.json()
+        self.cache.set(key, data, WEATHER_CACHE_TTLS[endpoint])
+        self.last_good.set(key, {'fetched_at': time.time(), 'data': data}, LAST_GOOD_TTL)
+        return data
+
+    def get_regional_data(self, counties_data, max_workers=REGIONAL_FETCH_WORKERS, sampling=REGIONAL_SAMPLING_MODE):
+        """Get weather data for all counties
+
+        Counties are fetched concurrently on a bounded thread pool, so the total
+        time is set by the slowest county rather than the sum of all of them.
+        Rows keep the state/county order of ``counties_data``, which may be the
+        nested county dict or a CountyRegistry. Pass ``max_workers=1`` to
+        fetch serially.
+
+        With ``sampling`` 'cell' or 'grid' only the plan's sample points are
+        fetched and county values are interpolated from them; see
+        build_interpolated_frame.
+        """
+        locations = county_locations(counties_data)
+        if not locations:
+            return pd.DataFrame()
+
+        plan = self.sampling_plan(locations, sampling)
+        targets = locations if plan is None else self.sample_locations(locations, plan)
+        weathers = [None] * len(targets)
+        for index, _, weather in self.iter_regional_data(targets, max_workers):
+            weathers[index] = weather
+        if plan is None:
+            return self.build_regional_frame(locations, weathers)
+        return self.build_interpolated_frame(locations, plan, weathers)
+
+    def iter_regional_data(self, counties_data, max_workers=REGIONAL_FETCH_WORKERS):
+        """Yield (index, (state, county, coords), weather) as each county completes
+
+        ``index`` is the county's position in ``counties_data``. Closing the
+        generator early cancels the fetches that have not started yet.
+        """
+        locations = county_locations(counties_data)
+        fetch = lambda location: self.get_county_weather(location[1], location[2])
+        workers = max(1, min(max_workers or 1, len(locations)))
+        if workers == 1:
+            for index, location in enumerate(locations):
+                yield index, location, fetch(location)
+            return
+
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="county-fetch")
+        try:
+            futures = {executor.submit(fetch, location): (index, location) for index, location in enumerate(locations)}
+            for future in as_completed(futures):
+                index, location = futures[future]
+                yield index, location, future.result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_county_weather(self, county, coords):
+        """Weather for one county that never raises, falling back to mock data"""
+        try:
+            return self.get_weather_data(coords['lat'], coords['lon'], county)
+        except Exception as e:
+            print(f"Regional fetch error for {county}: {e}")
+            return self.mock_weather(coords['lat'], coords['lon'], county)